@@ -13,3 +13,44 @@ def get_html_theme_path():
     """Return list of HTML theme paths."""
     cur_dir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
     return cur_dir
+
+
+def theme_option(builder, name):
+    """Boolean theme option of the html builders, False for other builders"""
+    if builder.format != 'html':
+        return False
+    # theme options from theme.conf are strings, from conf.py anything
+    context = getattr(builder, 'globalcontext', None)
+    if context is not None:
+        value = context.get('theme_' + name, False)
+    elif getattr(builder, 'theme', None) is not None:
+        # no page was written in this build
+        value = builder.theme.get_options(getattr(builder, 'theme_options', {})).get(name, False)
+    else:
+        return False
+    if isinstance(value, str):
+        return value.lower() in ('true', 'yes', '1')
+    return bool(value)
+
+
+def setup(app):
+    """Optional extension part of the theme, enables the symbol search box,
+    fingerprinted static files, the lazily loaded navigation, hover previews and
+    post processing of the output"""
+    from . import assets, compress, navigation, previews, symbolsearch
+    app.connect('builder-inited', assets.prepare_assets)
+    app.connect('html-collect-pages', navigation.collect_pages)
+    app.connect('html-page-context', assets.add_context)
+    app.connect('html-page-context', navigation.add_context)
+    app.connect('html-page-context', symbolsearch.add_context)
+    app.connect('doctree-resolved', previews.write_previews)
+    app.connect('build-finished', assets.write_assets)
+    app.connect('build-finished', symbolsearch.write_symbol_index)
+    app.connect('build-finished', previews.remove_stale_previews)
+    # last, so it sees the files written by the other handlers
+    app.connect('build-finished', compress.compress_output)
+    app.add_config_value('anarchy_fingerprint_assets', True, 'html')
+    app.add_config_value('anarchy_asset_fingerprints', [], 'html')
+    app.add_config_value('anarchy_minify_html', False, '')
+    app.add_config_value('anarchy_precompress', False, '')
+    app.add_config_value('anarchy_postprocess_jobs', 0, '')
@@ -0,0 +1,130 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Fingerprinted static assets.
+
+The stylesheet and the scripts of the theme are written to ``_static`` a second
+time under a name containing a hash of their content (the stylesheet minified),
+and the templates link to those names. As every change results in a new name,
+the files can be served with far future cache headers.
+
+``critical.css`` is minified and inlined into every page, so the layout is right
+while the full stylesheet is loading.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+# name in _static -> (fingerprinted name, content)
+assets = {}
+critical_css = ''
+
+scripts = ['symbolsearch.js', 'navigation.js', 'instantnav.js', 'previews.js']
+
+comment_pattern = re.compile(r'/\*.*?\*/|("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')', re.S)
+string_pattern = re.compile(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')', re.S)
+
+
+def compact(css):
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r' ?([{};,>]) ?', r'\1', css)
+    css = css.replace(': ', ':')
+    return css.replace(';}', '}')
+
+
+def minify_css(css):
+    # drop comments, but not what looks like a comment inside of a string
+    css = comment_pattern.sub(lambda match: match.group(1) or ' ', css)
+    parts = string_pattern.split(css)
+    for i in range(0, len(parts), 2):
+        parts[i] = compact(parts[i])
+    return ''.join(parts).strip()
+
+
+def find_static(builder, name):
+    """Locate `name` the same way the builder does when copying static files:
+    ``html_static_path`` overrides the theme, a theme overrides its base"""
+    directories = [os.path.join(builder.confdir, path) for path in reversed(builder.config.html_static_path)]
+    directories.extend(os.path.join(path, 'static') for path in builder.theme.get_dirchain())
+    for directory in directories:
+        candidate = os.path.join(directory, name)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def prepare_assets(app):
+    global critical_css
+    assets.clear()
+    critical_css = ''
+    builder = app.builder
+    if builder.format != 'html' or not app.config.anarchy_fingerprint_assets or not getattr(builder, 'theme', None):
+        return
+
+    for name in [builder.theme.get_confstr('theme', 'stylesheet')] + scripts:
+        source = find_static(builder, name)
+        if source is None:
+            continue
+        with open(source, 'rb') as fp:
+            content = fp.read()
+        if name.endswith('.css'):
+            content = minify_css(content.decode('utf-8')).encode('utf-8')
+        base, ext = os.path.splitext(name)
+        assets[name] = ('{}.{}{}'.format(base, hashlib.sha1(content).hexdigest()[:12], ext), content)
+
+    for directory in builder.theme.get_dirchain():
+        source = os.path.join(directory, 'critical.css')
+        if os.path.isfile(source):
+            with open(source, encoding='utf-8') as fp:
+                critical_css = minify_css(fp.read())
+            break
+
+    # not meant to be set by users: the config values of the html builder are
+    # part of its build info, so new fingerprints make it write all pages again
+    app.config.anarchy_asset_fingerprints = sorted([fingerprinted for fingerprinted, content in assets.values()] + [critical_css])
+    # Sphinx 1.6 hashes the config in builder.init(), before builder-inited
+    build_info = getattr(builder, 'build_info', None)
+    if build_info is not None:
+        builder.build_info = type(build_info)(app.config, builder.tags)
+
+
+def add_context(app, pagename, templatename, context, doctree):
+    context['static_assets'] = {name: '_static/' + fingerprinted for name, (fingerprinted, content) in assets.items()}
+    context['critical_css'] = critical_css
+
+
+def write_assets(app, exception):
+    if exception is not None or not assets:
+        return
+
+    static = os.path.join(app.builder.outdir, '_static')
+    os.makedirs(static, exist_ok=True)
+    # name -> fingerprinted names of this and the previous build
+    manifest_path = os.path.join(static, '.anarchy-assets.json')
+    try:
+        with open(manifest_path, encoding='utf-8') as fp:
+            manifest = json.load(fp)
+    except (OSError, ValueError):
+        manifest = {}
+
+    for name, (fingerprinted, content) in assets.items():
+        path = os.path.join(static, fingerprinted)
+        if not os.path.exists(path):
+            with open(path, 'wb') as fp:
+                fp.write(content)
+
+        # pages that were not written again and cached copies of pages may still
+        # link to the previous version, only the ones before are removed
+        versions = [fingerprinted] + [version for version in manifest.get(name, []) if version != fingerprinted][:1]
+        manifest[name] = versions
+        base, ext = os.path.splitext(name)
+        stale = re.compile(re.escape(base) + r'\.[0-9a-f]{12}' + re.escape(ext) + '$')
+        for filename in os.listdir(static):
+            if filename not in versions and stale.match(filename):
+                os.unlink(os.path.join(static, filename))
+
+    with open(manifest_path, 'w', encoding='utf-8') as fp:
+        json.dump(manifest, fp, indent=1, sort_keys=True)
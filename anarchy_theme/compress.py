@@ -0,0 +1,153 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Post build minification and precompression.
+
+After a successful build the HTML pages are minified and every text file of the
+output gets ``.gz`` (and ``.br`` if the ``brotli`` package is installed) siblings,
+so a static file server can deliver them without compressing on the fly. The
+work is spread over a process pool. The content hash of every processed file is
+kept in ``.anarchy-compress.json`` in the output directory, files that did not
+change since the last run are skipped.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+manifest_name = '.anarchy-compress.json'
+
+extensions = ('.html', '.css', '.js', '.json', '.svg', '.txt', '.xml')
+
+# whitespace in these is significant or not html
+protected_pattern = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.S | re.I)
+comment_pattern = re.compile(r'<!--(?!\[if).*?-->', re.S)
+whitespace_pattern = re.compile(r'\s+')
+
+
+def minify_html(html):
+    parts = protected_pattern.split(html)
+    result = []
+    # split returns text, protected block, tag name, text, ...
+    for i in range(0, len(parts), 3):
+        result.append(whitespace_pattern.sub(' ', comment_pattern.sub('', parts[i])))
+        if i + 1 < len(parts):
+            result.append(parts[i + 1])
+    return ''.join(result).strip()
+
+
+def siblings(path, use_brotli):
+    result = [path + '.gz']
+    if use_brotli:
+        result.append(path + '.br')
+    return result
+
+
+def process_file(job):
+    """Minify and compress one file, returns its new content hash"""
+    path, old_hash, minify, compress, use_brotli = job
+    with open(path, 'rb') as fp:
+        content = fp.read()
+    digest = hashlib.sha1(content).hexdigest()
+    expected = siblings(path, use_brotli) if compress else []
+    if digest == old_hash and all(os.path.exists(sibling) for sibling in expected):
+        return digest, False
+
+    if minify and path.endswith('.html'):
+        minified = minify_html(content.decode('utf-8')).encode('utf-8')
+        if minified != content:
+            content = minified
+            with open(path, 'wb') as fp:
+                fp.write(content)
+            digest = hashlib.sha1(content).hexdigest()
+            # sphinx wrote the page again, but nothing changed
+            if digest == old_hash and all(os.path.exists(sibling) for sibling in expected):
+                return digest, False
+
+    if not compress:
+        return digest, True
+
+    # no timestamp in the header, so unchanged content gives identical archives
+    with open(path + '.gz', 'wb') as fp:
+        with gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=fp, mtime=0) as gz:
+            gz.write(content)
+    if use_brotli:
+        with open(path + '.br', 'wb') as fp:
+            fp.write(brotli.compress(content))
+    return digest, True
+
+
+def load_manifest(outdir):
+    try:
+        with open(os.path.join(outdir, manifest_name), encoding='utf-8') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(outdir, manifest):
+    path = os.path.join(outdir, manifest_name)
+    with open(path + '.tmp', 'w', encoding='utf-8') as fp:
+        json.dump(manifest, fp, indent=0, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def output_files(outdir):
+    for root, dirnames, filenames in os.walk(outdir):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if filename.endswith(extensions) and not filename.startswith('.'):
+                yield os.path.relpath(os.path.join(root, filename), outdir)
+
+
+def compress_output(app, exception):
+    config = app.config
+    if exception is not None or app.builder.format != 'html':
+        return
+    if not config.anarchy_minify_html and not config.anarchy_precompress:
+        return
+
+    outdir = app.builder.outdir
+    compress = bool(config.anarchy_precompress)
+    use_brotli = compress and brotli is not None
+    old_manifest = load_manifest(outdir)
+    files = sorted(file for file in output_files(outdir) if compress or file.endswith('.html'))
+    jobs = [
+        (os.path.join(outdir, file), old_manifest.get(file), config.anarchy_minify_html, compress, use_brotli)
+        for file in files
+    ]
+
+    workers = config.anarchy_postprocess_jobs or os.cpu_count() or 1
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(process_file, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        results = [process_file(job) for job in jobs]
+
+    manifest = {}
+    changed = 0
+    for file, (digest, processed) in zip(files, results):
+        manifest[file] = digest
+        changed += processed
+
+    # compressed versions of files that are gone
+    for file in old_manifest:
+        if file not in manifest:
+            for sibling in siblings(os.path.join(outdir, file), True):
+                try:
+                    os.unlink(sibling)
+                except OSError:
+                    pass
+
+    save_manifest(outdir, manifest)
+    app.info('post processed {} of {} output files'.format(changed, len(files)))
+
@@ -0,0 +1,31 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Lazily loaded global navigation.
+
+With the ``lazy_navigation`` theme option the global table of contents is not
+rendered into every page anymore. It is rendered once per build into the
+``_globaltoc.html`` fragment, which ``navigation.js`` loads and inserts into the
+sidebar, marking the current page there. The time needed to write a page and its
+size then no longer depend on the size of the table of contents.
+"""
+
+from . import theme_option
+
+fragment_name = '_globaltoc'
+
+
+def enabled(builder):
+    return theme_option(builder, 'lazy_navigation')
+
+
+def collect_pages(app):
+    if not enabled(app.builder):
+        return []
+    return [(fragment_name, {}, 'globaltoc_fragment.html')]
+
+
+def add_context(app, pagename, templatename, context, doctree):
+    if enabled(app.builder):
+        context['global_toc_fragment'] = fragment_name
@@ -0,0 +1,116 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Hover previews for Swift cross references.
+
+With the ``hover_previews`` theme option every documented Swift symbol gets a
+tiny JSON file with its signature and the first paragraph of its documentation,
+at ``_previews/<page>/<anchor>.json``. ``previews.js`` fetches it when the
+mouse rests on a reference and shows it as a tooltip.
+
+``<page>`` is the link to the document as the builder writes it, like
+``api/foo.html`` or ``api/foo`` for ``dirhtml``, so the script does not have to
+know the file suffix to find the previews of a link.
+"""
+
+import json
+import os
+import re
+
+from docutils import nodes
+from sphinx import addnodes
+
+from . import theme_option
+
+preview_dir = '_previews'
+
+
+def fragment_name(anchor):
+    """File name for an anchor, previews.js has to agree"""
+    return re.sub(r'[^A-Za-z0-9._-]', lambda match: '_{:x}_'.format(ord(match.group())), anchor) + '.json'
+
+
+def preview_path(builder, docname):
+    """Directory of the previews of a document below _previews, previews.js has to agree"""
+    return builder.get_target_uri(docname).rstrip('/') or 'index'
+
+
+def signature_text(node):
+    """Like `astext`, but with the parentheses and arrows the html writer adds"""
+    parts = []
+    for child in node.children:
+        if isinstance(child, addnodes.desc_parameterlist):
+            parts.append('(' + ', '.join(signature_text(param) for param in child.children) + ')')
+        elif isinstance(child, addnodes.desc_returns):
+            parts.append(' -> ' + signature_text(child))
+        elif isinstance(child, nodes.Text):
+            parts.append(child.astext())
+        else:
+            parts.append(signature_text(child))
+    return ''.join(parts)
+
+
+def summary(content):
+    for child in content.children:
+        if isinstance(child, nodes.paragraph):
+            return child.astext()
+    return ''
+
+
+def symbol_previews(doctree):
+    for desc in doctree.traverse(addnodes.desc):
+        if desc.get('domain') != 'swift':
+            continue
+        content = [child for child in desc.children if isinstance(child, addnodes.desc_content)]
+        text = summary(content[0]) if content else ''
+        for signature in desc.children:
+            if isinstance(signature, addnodes.desc_signature) and signature['ids']:
+                yield signature['ids'][0], {
+                    'type': desc.get('objtype', '').replace('_', ' '),
+                    'signature': signature_text(signature).strip(),
+                    'summary': text,
+                }
+
+
+def write_previews(app, doctree, docname):
+    if not theme_option(app.builder, 'hover_previews'):
+        return
+
+    path = os.path.join(app.builder.outdir, preview_dir, preview_path(app.builder, docname))
+    written = set()
+    for anchor, preview in symbol_previews(doctree):
+        filename = fragment_name(anchor)
+        written.add(filename)
+        content = json.dumps(preview, separators=(',', ':'), ensure_ascii=False)
+        target = os.path.join(path, filename)
+        try:
+            with open(target, encoding='utf-8') as fp:
+                if fp.read() == content:
+                    continue
+        except OSError:
+            pass
+        os.makedirs(path, exist_ok=True)
+        with open(target, 'w', encoding='utf-8') as fp:
+            fp.write(content)
+
+    if os.path.isdir(path):
+        for filename in os.listdir(path):
+            if filename.endswith('.json') and filename not in written:
+                os.unlink(os.path.join(path, filename))
+
+
+def remove_stale_previews(app, exception):
+    """Remove the previews of deleted documents"""
+    if exception is not None or not theme_option(app.builder, 'hover_previews'):
+        return
+    root = os.path.join(app.builder.outdir, preview_dir)
+    pages = set(preview_path(app.builder, docname) for docname in app.env.all_docs)
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        if os.path.relpath(dirpath, root).replace(os.sep, '/') in pages:
+            continue
+        for filename in filenames:
+            os.unlink(os.path.join(dirpath, filename))
+        # directories of documents in subdirectories stay
+        if dirpath != root and not os.listdir(dirpath):
+            os.rmdir(dirpath)
@@ -0,0 +1,231 @@
+/*
+ * instantnav.js
+ * ~~~~~~~~~~~~~
+ *
+ * Client side navigation: links to other pages of the documentation are
+ * prefetched on hover or when they scroll into view, and following them only
+ * swaps the parts marked with data-swap and the sidebar links. The layout,
+ * scripts, styles and a lazily loaded navigation stay in place. Anything
+ * unexpected falls back to loading the page normally.
+ *
+ * :copyright: Copyright 2016 by Johannes Schriewer
+ * :license: BSD, see LICENSE for details.
+ */
+
+(function() {
+  var MAX_PREFETCH = 30;
+  var pages = {};
+  var prefetched = 0;
+  var shown = window.location.href.split('#')[0];
+
+  if (!window.history || !window.history.pushState || !window.DOMParser) {
+    return;
+  }
+
+  function withoutHash(url) {
+    return url.split('#')[0];
+  }
+
+  function isPage(link) {
+    if (link.target || link.hasAttribute('download') || link.origin != window.location.origin) {
+      return false;
+    }
+    var path = link.pathname;
+    if (!/(\.html|\/)$/.test(path) || /\/_(static|sources|images|downloads)\//.test(path)) {
+      return false;
+    }
+    // links to anchors of this page work without us
+    return withoutHash(link.href) != withoutHash(window.location.href);
+  }
+
+  function load(url, callback) {
+    url = withoutHash(url);
+    var page = pages[url];
+    if (page && page.html !== undefined) {
+      callback(page.html);
+      return;
+    }
+    if (page) {
+      page.waiting.push(callback);
+      return;
+    }
+    page = pages[url] = {waiting: [callback]};
+    var request = new XMLHttpRequest();
+    request.open('GET', url);
+    request.onload = request.onerror = function() {
+      page.html = request.status == 200 ? request.responseText : null;
+      if (page.html === null) {
+        delete pages[url];
+      }
+      for (var i = 0; i < page.waiting.length; i++) {
+        page.waiting[i](page.html);
+      }
+      page.waiting = [];
+    };
+    request.send();
+  }
+
+  function prefetch(link) {
+    if (prefetched < MAX_PREFETCH && isPage(link) && !pages[withoutHash(link.href)]) {
+      prefetched++;
+      load(link.href, function() {});
+    }
+  }
+
+  function scripts(doc) {
+    var result = [];
+    var elements = doc.querySelectorAll('script[src]');
+    for (var i = 0; i < elements.length; i++) {
+      result.push(elements[i].getAttribute('src').split('/').pop());
+    }
+    return result.sort().join(' ');
+  }
+
+  function markCurrent(toc) {
+    var here = withoutHash(window.location.href);
+    var current = toc.querySelectorAll('.current');
+    for (var i = 0; i < current.length; i++) {
+      current[i].className = current[i].className.replace(/\s*\bcurrent\b/g, '');
+    }
+    var links = toc.getElementsByTagName('a');
+    for (var j = 0; j < links.length; j++) {
+      if (withoutHash(links[j].href) != here) {
+        continue;
+      }
+      links[j].className += ' current';
+      for (var node = links[j].parentNode; node && node != toc; node = node.parentNode) {
+        if (node.tagName == 'LI' && !/\bcurrent\b/.test(node.className)) {
+          node.className += ' current';
+        }
+      }
+    }
+  }
+
+  // returns false if the page does not fit into the current layout
+  function swap(html, url) {
+    var doc = new DOMParser().parseFromString(html, 'text/html');
+    var parts = document.querySelectorAll('[data-swap]');
+    if (!parts.length || scripts(doc) != scripts(document)) {
+      return false;
+    }
+    var replacements = [];
+    for (var i = 0; i < parts.length; i++) {
+      var replacement = doc.querySelector('[data-swap="' + parts[i].getAttribute('data-swap') + '"]');
+      if (!replacement) {
+        return false;
+      }
+      replacements.push(replacement);
+    }
+
+    var root = /URL_ROOT:\s*'([^']*)'/.exec(html);
+    if (root) {
+      DOCUMENTATION_OPTIONS.URL_ROOT = root[1];
+    }
+    document.title = doc.title;
+    for (var j = 0; j < parts.length; j++) {
+      parts[j].parentNode.replaceChild(document.importNode(replacements[j], true), parts[j]);
+    }
+
+    // the sidebar has the links of the new page, but a lazily loaded navigation stays
+    var aside = document.querySelector('.main_content > aside');
+    var newAside = doc.querySelector('.main_content > aside');
+    if (aside && newAside) {
+      var toc = document.getElementById('globaltoc');
+      aside.innerHTML = newAside.innerHTML;
+      var slot = document.getElementById('globaltoc');
+      if (toc && slot) {
+        slot.parentNode.replaceChild(toc, slot);
+        markCurrent(toc);
+      }
+    }
+
+    var target = url.indexOf('#') >= 0 ? document.getElementById(decodeURIComponent(url.split('#')[1])) : null;
+    if (target) {
+      target.scrollIntoView();
+    } else {
+      window.scrollTo(0, 0);
+    }
+    observe(document);
+    return true;
+  }
+
+  // links that stay in place must not depend on the url of the page
+  function absolutize(root) {
+    var links = root ? root.getElementsByTagName('a') : [];
+    for (var i = 0; i < links.length; i++) {
+      if (links[i].hasAttribute('href')) {
+        links[i].setAttribute('href', links[i].href);
+      }
+    }
+  }
+
+  function navigate(url, push) {
+    load(url, function(html) {
+      absolutize(document.getElementById('globaltoc'));
+      if (push) {
+        window.history.pushState({instant: true}, '', url);
+      }
+      // links in the new content are relative to its url, so push before swapping
+      if (html === null || !swap(html, url)) {
+        window.location.replace(url);
+        return;
+      }
+      shown = withoutHash(url);
+    });
+  }
+
+  var observer = window.IntersectionObserver ? new IntersectionObserver(function(entries) {
+    for (var i = 0; i < entries.length; i++) {
+      if (entries[i].isIntersecting) {
+        observer.unobserve(entries[i].target);
+        prefetch(entries[i].target);
+      }
+    }
+  }) : null;
+
+  function observe(root) {
+    if (!observer) {
+      return;
+    }
+    var links = root.querySelectorAll('[data-swap] a[href]');
+    for (var i = 0; i < links.length; i++) {
+      if (isPage(links[i])) {
+        observer.observe(links[i]);
+      }
+    }
+  }
+
+  document.addEventListener('mouseover', function(event) {
+    var link = event.target.closest && event.target.closest('a[href]');
+    if (link) {
+      prefetch(link);
+    }
+  });
+
+  document.addEventListener('click', function(event) {
+    if (event.defaultPrevented || event.button != 0 || event.metaKey || event.ctrlKey || event.shiftKey || event.altKey) {
+      return;
+    }
+    var link = event.target.closest && event.target.closest('a[href]');
+    if (!link || !isPage(link)) {
+      return;
+    }
+    event.preventDefault();
+    navigate(link.href, true);
+  });
+
+  window.addEventListener('popstate', function() {
+    // only the anchor changed
+    if (withoutHash(window.location.href) == shown) {
+      return;
+    }
+    navigate(window.location.href, false);
+  });
+
+  window.history.replaceState({instant: true}, '', window.location.href);
+  if (document.readyState == 'loading') {
+    document.addEventListener('DOMContentLoaded', function() { observe(document); });
+  } else {
+    observe(document);
+  }
+})();
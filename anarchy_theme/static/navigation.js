@@ -0,0 +1,73 @@
+/*
+ * navigation.js
+ * ~~~~~~~~~~~~~
+ *
+ * Loads the global table of contents fragment into the sidebar and
+ * marks (and optionally expands only) the path to the current page.
+ *
+ * :copyright: Copyright 2016 by Johannes Schriewer
+ * :license: BSD, see LICENSE for details.
+ */
+
+(function() {
+  function withoutHash(url) {
+    return url.split('#')[0].replace(/\/index\.html$/, '/');
+  }
+
+  function markCurrent(container) {
+    var here = withoutHash(window.location.href);
+    var links = container.getElementsByTagName('a');
+    for (var i = 0; i < links.length; i++) {
+      var href = links[i].getAttribute('href');
+      // the fragment links relative to the documentation root
+      if (!/^([a-z]+:|\/|#)/i.test(href)) {
+        links[i].setAttribute('href', DOCUMENTATION_OPTIONS.URL_ROOT + href);
+      }
+      if (withoutHash(links[i].href) == here) {
+        links[i].className += ' current';
+        for (var node = links[i].parentNode; node && node != container; node = node.parentNode) {
+          if (node.tagName == 'LI' && !/\bcurrent\b/.test(node.className)) {
+            node.className += ' current';
+          }
+        }
+      }
+    }
+  }
+
+  // like sphinx does for collapse=True: only show children of the current path
+  function collapse(container) {
+    var lists = container.getElementsByTagName('ul');
+    for (var i = 0; i < lists.length; i++) {
+      var parent = lists[i].parentNode;
+      if (parent.tagName == 'LI' && !/\bcurrent\b/.test(parent.className)) {
+        lists[i].style.display = 'none';
+      }
+    }
+  }
+
+  function init() {
+    var container = document.getElementById('globaltoc');
+    if (!container) {
+      return;
+    }
+    var request = new XMLHttpRequest();
+    request.open('GET', container.getAttribute('data-src'));
+    request.onload = function() {
+      if (request.status != 200) {
+        return;
+      }
+      container.innerHTML = request.responseText;
+      markCurrent(container);
+      if (container.getAttribute('data-collapse') == 'true') {
+        collapse(container);
+      }
+    };
+    request.send();
+  }
+
+  if (document.readyState == 'loading') {
+    document.addEventListener('DOMContentLoaded', init);
+  } else {
+    init();
+  }
+})();
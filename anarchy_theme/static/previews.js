@@ -0,0 +1,116 @@
+/*
+ * previews.js
+ * ~~~~~~~~~~~
+ *
+ * Shows the signature and summary of a Swift symbol when the mouse rests
+ * on a reference to it, loaded from the tiny per symbol files in _previews.
+ *
+ * :copyright: Copyright 2016 by Johannes Schriewer
+ * :license: BSD, see LICENSE for details.
+ */
+
+(function() {
+  var DELAY = 300;
+  var previews = {};
+  var tooltip = null;
+  var timer = null;
+
+  // same as fragment_name in previews.py
+  function fragmentName(anchor) {
+    return anchor.replace(/[^A-Za-z0-9._-]/g, function(c) {
+      return '_' + c.charCodeAt(0).toString(16) + '_';
+    }) + '.json';
+  }
+
+  function previewUrl(link) {
+    var root = document.createElement('a');
+    root.href = DOCUMENTATION_OPTIONS.URL_ROOT;
+    var url = link.href.split('#');
+    if (url.length < 2 || url[0].indexOf(root.href) != 0) {
+      return null;
+    }
+    // same as preview_path in previews.py: the link without a trailing slash
+    var page = url[0].slice(root.href.length).replace(/\/$/, '') || 'index';
+    return root.href + '_previews/' + page + '/' + fragmentName(decodeURIComponent(url[1]));
+  }
+
+  function load(url, callback) {
+    if (previews.hasOwnProperty(url)) {
+      callback(previews[url]);
+      return;
+    }
+    var request = new XMLHttpRequest();
+    request.open('GET', url);
+    request.onload = request.onerror = function() {
+      var preview = null;
+      if (request.status == 200) {
+        try {
+          preview = JSON.parse(request.responseText);
+        } catch (e) {}
+      }
+      previews[url] = preview;
+      callback(preview);
+    };
+    request.send();
+  }
+
+  function show(link, preview) {
+    hide();
+    tooltip = document.createElement('div');
+    tooltip.className = 'symbolpreview';
+    var signature = document.createElement('code');
+    signature.textContent = preview.signature;
+    var type = document.createElement('span');
+    type.className = 'type';
+    type.textContent = preview.type;
+    tooltip.appendChild(type);
+    tooltip.appendChild(signature);
+    if (preview.summary) {
+      var summary = document.createElement('p');
+      summary.textContent = preview.summary;
+      tooltip.appendChild(summary);
+    }
+    var rect = link.getBoundingClientRect();
+    tooltip.style.left = (rect.left + window.pageXOffset) + 'px';
+    tooltip.style.top = (rect.bottom + window.pageYOffset + 4) + 'px';
+    document.body.appendChild(tooltip);
+  }
+
+  function hide() {
+    if (tooltip) {
+      tooltip.parentNode.removeChild(tooltip);
+      tooltip = null;
+    }
+  }
+
+  function reference(target) {
+    var link = target.closest && target.closest('a.reference.internal');
+    return link && link.querySelector('code.swift') ? link : null;
+  }
+
+  document.addEventListener('mouseover', function(event) {
+    var link = reference(event.target);
+    if (!link) {
+      return;
+    }
+    var url = previewUrl(link);
+    if (!url) {
+      return;
+    }
+    clearTimeout(timer);
+    timer = setTimeout(function() {
+      load(url, function(preview) {
+        if (preview && link.matches(':hover')) {
+          show(link, preview);
+        }
+      });
+    }, DELAY);
+  });
+
+  document.addEventListener('mouseout', function(event) {
+    if (reference(event.target)) {
+      clearTimeout(timer);
+      hide();
+    }
+  });
+})();
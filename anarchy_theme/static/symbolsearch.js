@@ -0,0 +1,138 @@
+/*
+ * symbolsearch.js
+ * ~~~~~~~~~~~~~~~
+ *
+ * Symbol search box, loads only the shards of the symbol index that
+ * can contain matches for the typed prefix.
+ *
+ * :copyright: Copyright 2016 by Johannes Schriewer
+ * :license: BSD, see LICENSE for details.
+ */
+
+(function() {
+  // symbolsearch.py has to agree, one character queries load a shard with
+  // the first MAX_RESULTS results for that character
+  var PREFIX_LENGTH = 2;
+  var MAX_RESULTS = 20;
+  var shards = {};
+
+  function shardName(term) {
+    return term.slice(0, PREFIX_LENGTH).replace(/[^a-z0-9]/g, '_');
+  }
+
+  function loadShard(name, callback) {
+    if (shards.hasOwnProperty(name)) {
+      if (shards[name] instanceof Array) {
+        callback(shards[name]);
+      } else {
+        shards[name].push(callback);
+      }
+      return;
+    }
+
+    var waiting = shards[name] = [callback];
+    var request = new XMLHttpRequest();
+    request.open('GET', DOCUMENTATION_OPTIONS.URL_ROOT + '_static/symbols/' + name + '.json');
+    request.onload = request.onerror = function() {
+      var entries = [];
+      if (request.status == 200) {
+        try {
+          entries = JSON.parse(request.responseText);
+        } catch (e) {}
+      }
+      shards[name] = entries;
+      for (var i = 0; i < waiting.length; i++) {
+        waiting[i](entries);
+      }
+    };
+    request.send();
+  }
+
+  // first entry in the sorted shard whose term is not smaller than the query
+  function lowerBound(entries, query) {
+    var low = 0, high = entries.length;
+    while (low < high) {
+      var middle = (low + high) >> 1;
+      var entry = entries[middle];
+      if (entry[0].slice(entry[3]).toLowerCase() < query) {
+        low = middle + 1;
+      } else {
+        high = middle;
+      }
+    }
+    return low;
+  }
+
+  function search(query, callback) {
+    loadShard(shardName(query), function(entries) {
+      var results = [];
+      var seen = {};
+      for (var i = lowerBound(entries, query); i < entries.length && results.length < MAX_RESULTS; i++) {
+        var entry = entries[i];
+        if (entry[0].slice(entry[3]).toLowerCase().indexOf(query) != 0) {
+          break;
+        }
+        if (!seen.hasOwnProperty(entry[2])) {
+          seen[entry[2]] = true;
+          results.push(entry);
+        }
+      }
+      callback(results);
+    });
+  }
+
+  function render(list, results) {
+    list.innerHTML = '';
+    for (var i = 0; i < results.length; i++) {
+      var item = document.createElement('li');
+      var link = document.createElement('a');
+      link.href = DOCUMENTATION_OPTIONS.URL_ROOT + results[i][2];
+      link.textContent = results[i][0];
+      var type = document.createElement('span');
+      type.className = 'type';
+      type.textContent = results[i][1].replace('_', ' ');
+      item.appendChild(link);
+      item.appendChild(type);
+      list.appendChild(item);
+    }
+  }
+
+  function init() {
+    var form = document.getElementById('symbolsearch');
+    if (!form) {
+      return;
+    }
+    var input = form.querySelector('input');
+    var list = form.querySelector('ul');
+    var current = '';
+
+    input.addEventListener('input', function() {
+      var query = input.value.replace(/^\s+|\s+$/g, '').toLowerCase();
+      current = query;
+      if (!query) {
+        render(list, []);
+        return;
+      }
+      search(query, function(results) {
+        // a slow shard must not overwrite the results of a newer query
+        if (query == current) {
+          render(list, results);
+        }
+      });
+    });
+
+    form.addEventListener('submit', function(event) {
+      var first = list.querySelector('a');
+      if (first) {
+        event.preventDefault();
+        window.location.href = first.href;
+      }
+    });
+  }
+
+  if (document.readyState == 'loading') {
+    document.addEventListener('DOMContentLoaded', init);
+  } else {
+    init();
+  }
+})();
@@ -0,0 +1,115 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Client side symbol search.
+
+Writes the objects of the Swift domain into ``_static/symbols/<prefix>.json``
+shards, keyed by the first two characters of the search term, so the search box
+only ever downloads the few entries that can match what was typed instead of the
+complete ``searchindex.js``.
+
+A single typed character loads the shard named after that character. Besides the
+one character terms it holds the first results of all shards starting with the
+character, as many as the search box shows.
+
+Every entry is ``[name, type, uri, offset]``; the search term is the lowercase
+name starting at ``offset``. Members are listed under their full name and under
+their own name, so ``Foo.bar`` is found when searching for ``foo.b`` and ``bar``.
+"""
+
+import json
+import os
+import re
+from urllib.parse import quote
+
+shard_dir = os.path.join('_static', 'symbols')
+
+# length of the prefix the shards are keyed by and the number of results shown,
+# symbolsearch.js has to agree
+prefix_length = 2
+max_results = 20
+
+
+def shard_name(term):
+    return re.sub(r'[^a-z0-9]', '_', term[:prefix_length])
+
+
+def search_terms(name):
+    """Offsets of all suffixes of `name` that start a name component"""
+    offsets = [0]
+    depth = 0
+    for i, c in enumerate(name):
+        # do not split inside of argument labels
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '.' and depth == 0:
+            offsets.append(i + 1)
+    return offsets
+
+
+def symbol_shards(builder):
+    shards = {}
+    domain = builder.env.domains['swift']
+    for refname, dispname, typ, docname, anchor, priority in domain.get_objects():
+        if priority < 0:
+            continue
+        # classes, structs, ... carry their kind in front of the name
+        name = dispname.split(' ', 1)[-1]
+        uri = builder.get_target_uri(docname) + '#' + quote(domain.signature_anchor(refname), safe='():,.')
+        for offset in search_terms(name):
+            term = name[offset:].lower()
+            shards.setdefault(shard_name(term), []).append([name, typ, uri, offset])
+
+    by_character = {}
+    for name, entries in shards.items():
+        by_character.setdefault(name[0], []).extend(entries)
+    for entries in list(shards.values()) + list(by_character.values()):
+        entries.sort(key=lambda entry: (entry[0][entry[3]:].lower(), entry[0]))
+    for character, entries in by_character.items():
+        # `_` stands for every other character, the search box filters those itself
+        shards[character] = entries if character == '_' else first_results(entries)
+    return shards
+
+
+def first_results(entries):
+    """Entries up to the `max_results` distinct symbol the search box would show"""
+    uris = set()
+    for i, entry in enumerate(entries):
+        uris.add(entry[2])
+        if len(uris) > max_results:
+            return entries[:i]
+    return entries
+
+
+def write_symbol_index(app, exception):
+    builder = app.builder
+    if exception is not None or builder.format != 'html' or 'swift' not in builder.env.domains:
+        return
+
+    path = os.path.join(builder.outdir, shard_dir)
+    os.makedirs(path, exist_ok=True)
+    shards = symbol_shards(builder)
+    for name, entries in shards.items():
+        content = json.dumps(entries, separators=(',', ':'), ensure_ascii=False)
+        filename = os.path.join(path, name + '.json')
+        # unchanged shards keep their mtime so browsers and CDNs can keep them cached
+        try:
+            with open(filename, encoding='utf-8') as fp:
+                if fp.read() == content:
+                    continue
+        except OSError:
+            pass
+        with open(filename, 'w', encoding='utf-8') as fp:
+            fp.write(content)
+
+    for filename in os.listdir(path):
+        if filename.endswith('.json') and filename[:-5] not in shards:
+            os.unlink(os.path.join(path, filename))
+
+
+def add_context(app, pagename, templatename, context, doctree):
+    # the shards are only written for projects that use the swift domain
+    context['symbol_search'] = 'swift' in app.builder.env.domains
@@ -0,0 +1,13 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Benchmarks for the Swift domain, run from a checkout:
+
+- ``python -m benchmarks.corpus``: write a synthetic Swift corpus
+- ``python -m benchmarks.indexer``: time the indexer on a synthetic corpus
+- ``python -m benchmarks.build``: time Sphinx builds of a generated project
+
+Results are written as JSON, pass the file of an earlier run with ``--compare``
+to see what got faster or slower.
+"""
@@ -0,0 +1,254 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+End to end benchmark of Sphinx builds with the Swift domain.
+
+Creates a throw away Sphinx project with ``autoswift`` directives and cross
+references over a generated corpus and times full, unchanged and incremental
+(one Swift file changed) builds, serial and with ``-j``. Every build runs in its
+own process like ``sphinx-build`` would, the phase timings come from the
+instrumentation of the Swift domain.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import add_corpus_arguments, corpus_options, generate
+
+parser = argparse.ArgumentParser(description='Time Sphinx builds of a generated Swift project.')
+parser.add_argument(
+    '--output',
+    metavar='file',
+    type=str,
+    default=None,
+    help='Write the results as JSON to this file'
+)
+parser.add_argument(
+    '--compare',
+    metavar='file',
+    type=str,
+    default=None,
+    help='Results of an earlier run to compare with'
+)
+parser.add_argument(
+    '--project',
+    metavar='path',
+    type=str,
+    default=None,
+    help='Keep the generated project in this directory instead of a temporary one'
+)
+parser.add_argument(
+    '--directives',
+    metavar='N',
+    type=int,
+    default=200,
+    help='Number of autoswift directives'
+)
+parser.add_argument(
+    '--xrefs',
+    metavar='M',
+    type=int,
+    default=1000,
+    help='Number of cross references to Swift types'
+)
+parser.add_argument(
+    '--per-page',
+    metavar='N',
+    type=int,
+    default=20,
+    help='Directives and cross references per document'
+)
+parser.add_argument(
+    '-j', '--jobs',
+    dest='jobs',
+    metavar='N',
+    type=int,
+    default=4,
+    help='Processes for the parallel builds, 1 to only build serially'
+)
+parser.add_argument(
+    '-b', '--builder',
+    dest='builder',
+    type=str,
+    default='html',
+    help='Sphinx builder to use'
+)
+parser.add_argument(
+    '--python',
+    metavar='executable',
+    type=str,
+    default=sys.executable,
+    help='Python interpreter to run Sphinx with'
+)
+add_corpus_arguments(parser)
+
+conf_template = '''
+project = 'Benchmark'
+master_doc = 'index'
+extensions = ['swift_domain']
+swift_search_path = [{source!r}]
+swift_instrumentation = {instrumentation!r}
+'''
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def write_project(path, source, stats, directives, xrefs, per_page):
+    """Write conf.py and the documents, returns the list of docnames"""
+    docs = os.path.join(path, 'docs')
+    os.makedirs(docs, exist_ok=True)
+    with open(os.path.join(docs, 'conf.py'), 'w', encoding='utf-8') as fp:
+        fp.write(conf_template.format(source=source, instrumentation=os.path.join(path, 'instrumentation')))
+
+    # toplevel types only, nested ones are documented with their parents
+    names = [name for name in stats['names'] if '.' not in name]
+    documents = []
+    targets = [names[i % len(names)] for i in range(directives)]
+    for i, chunk in enumerate(chunks(sorted(set(targets)), per_page)):
+        lines = ['API {}'.format(i), '=' * 12, '']
+        for name in chunk:
+            lines += ['.. autoswift:: ' + name, '   :members:', '   :undoc-members:', '']
+        documents.append(('api{}'.format(i), lines))
+
+    references = [names[(i * 7) % len(names)] for i in range(xrefs)]
+    for i, chunk in enumerate(chunks(references, per_page)):
+        lines = ['References {}'.format(i), '=' * 20, '']
+        for name in chunk:
+            lines += ['- :swift:{}:`{}`'.format(stats['types'][name], name)]
+        documents.append(('refs{}'.format(i), lines))
+
+    index = ['Benchmark', '=========', '', '.. toctree::', '']
+    index += ['   ' + docname for docname, _ in documents]
+    for docname, lines in documents + [('index', index)]:
+        with open(os.path.join(docs, docname + '.rst'), 'w', encoding='utf-8') as fp:
+            fp.write('\n'.join(lines) + '\n')
+    return docs
+
+
+def touch_swift_file(source, run):
+    """Change the content of one Swift file, like an edit would"""
+    for dirpath, dirnames, filenames in sorted(os.walk(source)):
+        for filename in sorted(filenames):
+            if filename.endswith('.swift'):
+                with open(os.path.join(dirpath, filename), 'a', encoding='utf-8') as fp:
+                    fp.write('// edit {}\n'.format(run))
+                return
+
+
+def sphinx_build(args, docs, outdir, instrumentation, jobs):
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join([root] + [p for p in [env.get('PYTHONPATH')] if p])
+    env['PYTHONWARNINGS'] = 'ignore'
+    command = [args.python, '-m', 'sphinx', '-q', '-b', args.builder, docs, outdir]
+    if jobs > 1:
+        command[3:3] = ['-j', str(jobs)]
+
+    start = time.perf_counter()
+    process = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    elapsed = time.perf_counter() - start
+    result = {'seconds': elapsed, 'jobs': jobs}
+    if process.returncode != 0:
+        # keep going, the other builds may still work
+        output = process.stdout.decode('utf-8', 'replace').strip().splitlines()
+        result['error'] = output[-1] if output else 'exit status {}'.format(process.returncode)
+        # sphinx-build reports the exception, then where the traceback went
+        if 'Exception occurred:' in output:
+            lines = output[output.index('Exception occurred:') + 1:]
+            result['error'] = next((line for line in lines if not line.startswith(' ')), result['error'])
+    try:
+        with open(os.path.join(instrumentation, 'swift-instrumentation.json'), encoding='utf-8') as fp:
+            summary = json.load(fp)
+    except (OSError, ValueError):
+        return result
+    result['counters'] = summary['counters']
+    result['phases'] = dict(
+        (phase, {'count': data['count'], 'total': data['total'], 'max': data['max']})
+        for phase, data in summary['phases'].items()
+    )
+    os.unlink(os.path.join(instrumentation, 'swift-instrumentation.json'))
+    return result
+
+
+def run(args, path):
+    source = os.path.join(path, 'src')
+    stats = generate(source, **corpus_options(args))
+    docs = write_project(path, source, stats, args.directives, args.xrefs, args.per_page)
+    instrumentation = os.path.join(path, 'instrumentation')
+    print('corpus: {files} files, {lines} lines, {symbols} symbols'.format(**stats))
+    print('project: {} autoswift directives, {} cross references\n'.format(args.directives, args.xrefs))
+
+    results = {}
+    for jobs in sorted(set([1, args.jobs])):
+        outdir = os.path.join(path, 'build-j{}'.format(jobs))
+        builds = [
+            ('full', lambda: shutil.rmtree(outdir, ignore_errors=True)),
+            ('unchanged', None),
+            ('incremental', lambda: touch_swift_file(source, len(results))),
+        ]
+        for kind, prepare in builds:
+            if prepare:
+                prepare()
+            name = '{} -j{}'.format(kind, jobs)
+            results[name] = result = sphinx_build(args, docs, outdir, instrumentation, jobs)
+            if 'error' in result:
+                print('{:<18} failed: {}'.format(name, result['error']))
+                continue
+            phases = result.get('phases', {})
+            print('{:<18} {:9.3f}s   {}'.format(name, result['seconds'], '  '.join(
+                '{} {:.3f}s'.format(phase, phases[phase]['total']) for phase in sorted(phases)
+            )))
+    return stats, results
+
+
+def compare(results, previous):
+    print('\ncompared to the previous run:')
+    for name, result in sorted(results.items()):
+        before = previous.get('results', {}).get(name)
+        if not before or not before['seconds'] or 'error' in result or 'error' in before:
+            continue
+        print('{:<18} {:9.3f}s -> {:9.3f}s  {:+.1f}%'.format(
+            name,
+            before['seconds'],
+            result['seconds'],
+            (result['seconds'] / before['seconds'] - 1) * 100
+        ))
+
+
+def main():
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stats, results = run(args, args.project or tmp)
+
+    report = {
+        'benchmark': 'build',
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'corpus': dict(corpus_options(args), lines=stats['lines'], symbols=stats['symbols']),
+        'project': {'directives': args.directives, 'xrefs': args.xrefs, 'per_page': args.per_page},
+        'builder': args.builder,
+        'results': results,
+    }
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fp:
+            compare(results, json.load(fp))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump(report, fp, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Deterministic generator for synthetic Swift sources.
+
+The same parameters and seed always produce the same files, so timings of
+different runs are comparable.
+"""
+
+import argparse
+import os
+import random
+
+words = [
+    'account', 'buffer', 'cache', 'channel', 'client', 'color', 'context', 'data',
+    'delegate', 'document', 'element', 'event', 'file', 'frame', 'handler', 'image',
+    'index', 'item', 'layer', 'layout', 'list', 'manager', 'message', 'model', 'node',
+    'option', 'path', 'queue', 'record', 'request', 'response', 'result', 'session',
+    'socket', 'state', 'store', 'stream', 'task', 'token', 'value', 'view', 'window',
+]
+
+toplevel_types = ['class', 'struct', 'enum', 'protocol']
+
+
+def add_corpus_arguments(parser):
+    group = parser.add_argument_group('corpus')
+    group.add_argument('--files', type=int, default=50, help='Number of Swift files')
+    group.add_argument('--types', type=int, default=8, help='Toplevel types per file')
+    group.add_argument('--members', type=int, default=12, help='Members per type')
+    group.add_argument('--depth', type=int, default=2, help='Nesting depth of types in types')
+    group.add_argument(
+        '--doc-density',
+        type=float,
+        default=0.7,
+        help='Fraction of symbols with a documentation comment'
+    )
+    group.add_argument('--extensions', type=int, default=1, help='Extensions per toplevel type')
+    group.add_argument('--enum-cases', type=int, default=10, help='Cases per enum')
+    group.add_argument('--seed', type=int, default=42, help='Seed of the random generator')
+    return group
+
+
+def corpus_options(args):
+    return {
+        'files': args.files,
+        'types': args.types,
+        'members': args.members,
+        'depth': args.depth,
+        'doc_density': args.doc_density,
+        'extensions': args.extensions,
+        'enum_cases': args.enum_cases,
+        'seed': args.seed,
+    }
+
+
+class Generator(object):
+
+    def __init__(self, types=8, members=12, depth=2, doc_density=0.7, extensions=1, enum_cases=10, seed=42):
+        self.types = types
+        self.members = members
+        self.depth = depth
+        self.doc_density = doc_density
+        self.extensions = extensions
+        self.enum_cases = enum_cases
+        self.random = random.Random(seed)
+        self.symbols = 0
+        self.names = []
+        # qualified name -> type
+        self.type_of = {}
+
+    def identifier(self, capitalized=False):
+        name = self.random.choice(words) + self.random.choice(words).capitalize() + str(self.random.randrange(1000))
+        return name[0].upper() + name[1:] if capitalized else name
+
+    def doc_comment(self, indent, params=(), returns=False):
+        if self.random.random() >= self.doc_density:
+            return []
+        summary = ' '.join(self.random.choice(words) for _ in range(self.random.randint(4, 12)))
+        body = [summary.capitalize() + '.']
+        if self.random.random() < 0.3:
+            body += ['', 'Uses `' + self.random.choice(words) + '` internally:', '', '```', 'let x = 1', '```']
+        for param in params:
+            body.append('- parameter ' + param + ': the ' + self.random.choice(words))
+        if returns:
+            body.append('- returns: a ' + self.random.choice(words))
+        if self.random.random() < 0.1:
+            body.append('- note: ' + ' '.join(self.random.choice(words) for _ in range(6)))
+        if self.random.random() < 0.2:
+            return [indent + '/**'] + [indent + '   ' + line for line in body] + [indent + ' */']
+        return [indent + '/// ' + line if line else indent + '///' for line in body]
+
+    def member(self, indent, typ):
+        self.symbols += 1
+        kind = self.random.random()
+        if typ == 'protocol':
+            name = self.identifier()
+            if kind < 0.5:
+                return self.doc_comment(indent) + [indent + 'var ' + name + ': Int { get set }']
+            return self.doc_comment(indent, params=['value'], returns=True) + [
+                indent + 'func ' + name + '(value: Int) -> String'
+            ]
+        if kind < 0.4:
+            name = self.identifier()
+            return self.doc_comment(indent, params=['value', 'label'], returns=True) + [
+                indent + 'public func ' + name + '(value: Int, label: String = "") -> String {',
+                indent + '    // braces in strings and comments must not confuse the indexer',
+                indent + '    let text = "{\\(value) }" /* { */',
+                indent + '    if value > 0 {',
+                indent + '        return label + text',
+                indent + '    }',
+                indent + '    return text',
+                indent + '}',
+            ]
+        if kind < 0.5:
+            # the label keeps the initializers of a type apart
+            label = self.identifier()
+            return self.doc_comment(indent, params=['value', label]) + [
+                indent + 'public init(value: Int, ' + label + ': Int) {',
+                indent + '}',
+            ]
+        if kind < 0.7:
+            name = self.identifier()
+            return self.doc_comment(indent) + [
+                indent + 'public var ' + name + ': Int {',
+                indent + '    return ' + str(self.random.randrange(100)),
+                indent + '}',
+            ]
+        name = self.identifier()
+        scope = self.random.choice(['public ', 'private ', ''])
+        static = 'static ' if self.random.random() < 0.2 else ''
+        return self.doc_comment(indent) + [indent + scope + static + 'let ' + name + ': String = "' + name + '"']
+
+    def enum_case(self, indent):
+        self.symbols += 1
+        name = self.identifier()
+        kind = self.random.random()
+        if kind < 0.3:
+            line = 'case ' + name + '(Int, String)'
+        elif kind < 0.5:
+            line = 'case ' + name + ' = ' + str(self.random.randrange(1000))
+        else:
+            line = 'case ' + name
+        return self.doc_comment(indent) + [indent + line]
+
+    def type(self, indent, prefix, depth):
+        self.symbols += 1
+        typ = self.random.choice(toplevel_types)
+        name = self.identifier(capitalized=True)
+        self.names.append(prefix + name)
+        lines = self.doc_comment(indent)
+        if typ == 'protocol' and depth > 0:
+            # protocols may not be nested
+            typ = 'struct'
+        self.type_of[prefix + name] = typ
+        lines.append(indent + 'public ' + typ + ' ' + name + ' {')
+        if typ == 'enum':
+            for _ in range(self.enum_cases):
+                lines += self.enum_case(indent + '    ')
+        for _ in range(self.members):
+            lines += self.member(indent + '    ', typ)
+        if depth < self.depth and typ != 'protocol':
+            lines += self.type(indent + '    ', prefix + name + '.', depth + 1)[0]
+        lines.append(indent + '}')
+        lines.append('')
+        return lines, name, typ
+
+    def extension(self, name, typ):
+        self.symbols += 1
+        conformance = ': Equatable' if self.random.random() < 0.5 else ''
+        lines = self.doc_comment('') + ['extension ' + name + conformance + ' {']
+        for _ in range(max(1, self.members // 3)):
+            lines += self.member('    ', 'extension')
+        lines += ['}', '']
+        return lines
+
+    def file(self):
+        lines = ['// generated by benchmarks.corpus', '', 'import Foundation', '']
+        for _ in range(self.types):
+            type_lines, name, typ = self.type('', '', 0)
+            lines += type_lines
+            if typ != 'protocol':
+                for _ in range(self.extensions):
+                    lines += self.extension(name, typ)
+        return '\n'.join(lines) + '\n'
+
+
+def generate(path, files=50, **options):
+    """Write `files` Swift files to `path`, returns statistics about the corpus:
+    number of files, lines, symbols, the qualified names of all types and their
+    Swift types by name"""
+    generator = Generator(**options)
+    lines = 0
+    for i in range(files):
+        directory = os.path.join(path, 'Module{}'.format(i % 10))
+        os.makedirs(directory, exist_ok=True)
+        content = generator.file()
+        lines += content.count('\n')
+        with open(os.path.join(directory, 'File{}.swift'.format(i)), 'w', encoding='utf-8') as fp:
+            fp.write(content)
+    return {'files': files, 'lines': lines, 'symbols': generator.symbols, 'names': generator.names, 'types': generator.type_of}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Swift corpus.')
+    parser.add_argument('path', type=str, help='Directory to write the Swift files to')
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    stats = generate(args.path, **corpus_options(args))
+    print('wrote {files} Swift files, {lines} lines, {symbols} symbols'.format(**stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Micro benchmarks for the Swift indexer.
+
+Every benchmark runs ``--repeat`` times on a generated corpus and reports the best
+time, the throughput in lines and symbols per second and the peak memory of an
+additional run under ``tracemalloc``.
+"""
+
+import argparse
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import add_corpus_arguments, corpus_options, generate
+from swift_domain.indexer import (
+    SwiftFileIndex, SwiftObjectIndex, balance_braces, doc_block_to_rst, get_doc_block
+)
+from swift_domain.instrumentation import count_symbols
+
+parser = argparse.ArgumentParser(description='Time the Swift indexer on a synthetic corpus.')
+parser.add_argument(
+    '--output',
+    metavar='file',
+    type=str,
+    default=None,
+    help='Write the results as JSON to this file'
+)
+parser.add_argument(
+    '--compare',
+    metavar='file',
+    type=str,
+    default=None,
+    help='Results of an earlier run to compare with'
+)
+parser.add_argument(
+    '--corpus',
+    metavar='path',
+    type=str,
+    default=None,
+    help='Keep the generated corpus in this directory instead of a temporary one'
+)
+parser.add_argument(
+    '--repeat',
+    type=int,
+    default=3,
+    help='Runs per benchmark, the fastest one counts'
+)
+parser.add_argument(
+    '--fuzzy-lookups',
+    metavar='N',
+    type=int,
+    default=20,
+    help='Number of names to look up with find_fuzz, it is a lot slower than find'
+)
+parser.add_argument(
+    '--only',
+    metavar='benchmark',
+    action='append',
+    default=[],
+    help='Only run this benchmark, may be given multiple times'
+)
+add_corpus_arguments(parser)
+
+
+def read_sources(path):
+    sources = {}
+    for file in SwiftFileIndex([path]).files:
+        with open(file, encoding='utf-8') as fp:
+            sources[file] = io.StringIO(fp.read(), newline=None).readlines()
+    return sources
+
+
+def walk(index):
+    for item in index:
+        yield item
+        for child in walk(item['children']):
+            yield child
+
+
+def benchmarks(path, stats, fuzzy_lookups):
+    """Returns (name, function, lines, symbols) for every benchmark, `function` is
+    called without arguments and does the timed work"""
+    sources = read_sources(path)
+    file_index = SwiftFileIndex([path])
+    items = list(walk(file_index.index))
+    members = [member for item in items for member in item['members'].index]
+    docstrings = [item['docstring'] for item in items + members if item['docstring']]
+    names = stats['names']
+    # spread the lookups over the whole corpus
+    fuzzy_names = [name.lower() for name in names[::max(1, len(names) // max(1, fuzzy_lookups))][:fuzzy_lookups]]
+
+    def build_file_index():
+        SwiftFileIndex([path])
+
+    def build_object_indices():
+        for item in items:
+            content = sources[item['file']]
+            SwiftObjectIndex(content, item['line'] + 1, item['type'])
+
+    def doc_blocks():
+        for item in items:
+            content = sources[item['file']]
+            get_doc_block(content, item['line'] - 1)
+            # members do not know their file, they share the one of their parent
+            for member in item['members'].index:
+                get_doc_block(content, member['line'] - 1)
+
+    def braces():
+        for content in sources.values():
+            count = 0
+            for line in content:
+                count = balance_braces(line, count)
+
+    def rst():
+        for docstring in docstrings:
+            list(doc_block_to_rst(docstring))
+
+    def find():
+        for name in names:
+            list(file_index.find(name))
+
+    def aggregate():
+        # includes building the aggregates of all types from scratch
+        file_index._aggregates = None
+        for name in names:
+            merged = file_index.aggregate(name)
+            if merged is not None:
+                merged.item()['members'].index
+
+    def find_fuzz():
+        for name in fuzzy_names:
+            file_index.find_fuzz(name)
+
+    lines = stats['lines']
+    symbols = count_symbols(file_index.index)
+    return [
+        ('SwiftFileIndex', build_file_index, lines, symbols),
+        ('SwiftObjectIndex', build_object_indices, lines, len(members)),
+        ('get_doc_block', doc_blocks, None, len(items) + len(members)),
+        ('balance_braces', braces, lines, None),
+        ('doc_block_to_rst', rst, sum(len(docstring) for docstring in docstrings), len(docstrings)),
+        ('find', find, None, len(names)),
+        ('aggregate', aggregate, None, len(names)),
+        ('find_fuzz', find_fuzz, None, len(fuzzy_names)),
+    ]
+
+
+def measure(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak
+
+
+def run(args, path, stats):
+    results = {}
+    for name, function, lines, symbols in benchmarks(path, stats, args.fuzzy_lookups):
+        if args.only and name not in args.only:
+            continue
+        seconds, peak = measure(function, args.repeat)
+        result = {'seconds': seconds, 'peak_memory': peak}
+        if lines is not None:
+            result['lines'] = lines
+            result['lines_per_second'] = lines / seconds if seconds else None
+        if symbols is not None:
+            result['symbols'] = symbols
+            result['symbols_per_second'] = symbols / seconds if seconds else None
+        results[name] = result
+        print('{:<18} {:9.4f}s {:>12} {:>12} {:8.1f} MB'.format(
+            name,
+            seconds,
+            '{:.0f} lines/s'.format(result['lines_per_second']) if result.get('lines_per_second') else '',
+            '{:.0f} sym/s'.format(result['symbols_per_second']) if result.get('symbols_per_second') else '',
+            peak / 1024 / 1024
+        ))
+    return results
+
+
+def compare(results, previous):
+    print('\ncompared to the previous run:')
+    for name, result in sorted(results.items()):
+        before = previous.get('results', {}).get(name)
+        if not before or not result['seconds']:
+            continue
+        print('{:<18} {:9.4f}s -> {:9.4f}s  {:+.1f}%'.format(
+            name,
+            before['seconds'],
+            result['seconds'],
+            (result['seconds'] / before['seconds'] - 1) * 100
+        ))
+
+
+def main():
+    args = parser.parse_args()
+    options = corpus_options(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.corpus or tmp
+        stats = generate(path, **options)
+        print('corpus: {files} files, {lines} lines, {symbols} symbols\n'.format(**stats))
+        results = run(args, path, stats)
+
+    report = {
+        'benchmark': 'indexer',
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'corpus': dict(options, lines=stats['lines'], symbols=stats['symbols']),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as fp:
+            compare(results, json.load(fp))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump(report, fp, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
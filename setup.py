@@ -22,8 +22,10 @@ setup(
     package_data={
         'anarchy_theme': [
             'theme.conf',
+            'critical.css',
             '*.html',
-            'static/css/*.css'
+            'static/*.css',
+            'static/*.js'
         ]
     },
     entry_points={
@@ -46,5 +48,8 @@ setup(
     install_requires=[
         'fuzzywuzzy',
         'sphinx'
-    ]
+    ],
+    extras_require={
+        'symbolgraph': ['ijson']
+    }
 )
@@ -1,15 +1,163 @@
 # Copyright 2016 by Johannes Schriewer
 # BSD license, see LICENSE for details
 
+import os
+
 from sphinx.ext.autodoc import Documenter, bool_option, members_option, members_set_option
-from swift_domain.indexer import SwiftFileIndex, SwiftObjectIndex
+from swift_domain.cache import IndexCache
+from swift_domain.indexer import SwiftFileIndex, SwiftObjectIndex, find_swift_files, is_glob
+from swift_domain.instrumentation import instrumentation, count_symbols
+from swift_domain.quarantine import Quarantine
+from swift_domain.symbolgraph import find_symbol_graphs
+from swift_domain.symtab import SymbolTable
 
 file_index = None
 
 
 def build_index(app):
     global file_index
-    file_index = SwiftFileIndex(app.config.swift_search_path)
+    instrumentation.enabled = bool(app.config.swift_instrumentation)
+    instrumentation.reset()
+    with instrumentation.span('index', 'build index'):
+        load_index(app)
+    if instrumentation.enabled:
+        if isinstance(file_index, SymbolTable):
+            instrumentation.count('symbols', file_index.item_count + file_index.member_count)
+        else:
+            instrumentation.count('symbols', count_symbols(file_index.index))
+
+
+def load_index(app):
+    global file_index
+    symbol_graphs = find_symbol_graphs(app.config.swift_symbol_graph_path, app.config.swift_symbol_graph_modules)
+    table = app.config.swift_symbol_table
+    if table and os.path.exists(table):
+        try:
+            file_index = SwiftFileIndex.load_symbol_table(table)
+            files = find_swift_files(app.config.swift_search_path, app.config.swift_exclude_patterns)
+            if file_index.is_fresh(files + symbol_graphs):
+                instrumentation.count('symbol table loaded')
+                return
+            file_index.close()
+        except ValueError:
+            pass
+
+    cache = None
+    if app.config.swift_index_cache:
+        cache = IndexCache(
+            app.config.swift_index_cache,
+            max_size=app.config.swift_index_cache_max_size,
+            max_age=app.config.swift_index_cache_max_age
+        )
+
+    def progress(files):
+        return app.status_iterator(files, 'indexing swift files... ', length=len(files), stringify_func=os.path.relpath)
+
+    file_index = SwiftFileIndex(
+        app.config.swift_search_path,
+        exclude_patterns=app.config.swift_exclude_patterns,
+        cache=cache,
+        symbol_graphs=symbol_graphs,
+        progress=progress,
+        # may be a string when given with -D
+        budget=float(app.config.swift_parse_budget) if app.config.swift_parse_budget else None,
+        quarantine=Quarantine(app.config.swift_quarantine) if app.config.swift_quarantine else None
+    )
+    for file, start, duration, pid, cached in file_index.parse_times:
+        app.verbose('parsed %s in %.3fs%s', os.path.relpath(file), duration, ' (cached)' if cached else '')
+    for file, elapsed, line in file_index.timeouts:
+        app.warn('parsing {} took too long, aborted after {:.2f}s in line {}'.format(os.path.relpath(file), elapsed, line))
+    for file in file_index.quarantined:
+        app.info('skipping quarantined Swift file {}'.format(os.path.relpath(file)))
+    app.info(file_index.summary())
+    if table:
+        file_index.save_symbol_table(table)
+
+
+def source_mtime(file):
+    try:
+        return os.stat(file).st_mtime_ns
+    except OSError:
+        return None
+
+
+def note_source(env, file):
+    """Remember that the current document was generated from `file`"""
+    sources = env.domaindata['swift']['sources'].setdefault(env.docname, {})
+    if file not in sources:
+        sources[file] = source_mtime(file)
+
+
+def outdated_documents(app, env, added, changed, removed):
+    """Reread only documents whose Swift sources changed since they were read"""
+    global file_index
+    data = env.domaindata['swift']
+    result = []
+    for docname, sources in data['sources'].items():
+        if docname in changed or docname in removed:
+            continue
+        for file, mtime in sources.items():
+            if source_mtime(file) != mtime:
+                result.append(docname)
+                break
+
+    # names that resolve to declarations in other files now, like a new extension
+    for docname, names in data['resolved'].items():
+        if docname in changed or docname in removed or docname in result:
+            continue
+        for name, files in names.items():
+            if resolved_files(name) != files:
+                result.append(docname)
+                break
+
+    # merged types that gained or lost declarations, like an extension in a new file
+    for docname, names in data['aggregates'].items():
+        if docname in changed or docname in removed or docname in result:
+            continue
+        for name, files in names.items():
+            if aggregate_files(file_index.aggregate(name)) != files:
+                result.append(docname)
+                break
+
+    # symbols that could not be found before may have been added since
+    for docname, names in data['unresolved'].items():
+        if docname in changed or docname in removed or docname in result:
+            continue
+        for name in names:
+            found = file_index.find_glob(name) if is_glob(name) else file_index.find(name)
+            if next(found, None) is not None:
+                result.append(docname)
+                break
+
+    # globs that match a different set of symbols now
+    for docname, globs in data['globs'].items():
+        if docname in changed or docname in removed or docname in result:
+            continue
+        for pattern, names in globs.items():
+            if glob_names(pattern) != names:
+                result.append(docname)
+                break
+    return result
+
+
+def resolved_files(name):
+    return set(item['file'] for item in file_index.find(name))
+
+
+def aggregate_files(aggregate):
+    return set(item['file'] for item in aggregate.all) if aggregate is not None else set()
+
+
+def glob_names(pattern):
+    return sorted(set(name for name, _ in file_index.find_glob(pattern)))
+
+
+def swift_file_candidates(env, name):
+    """Where the file of an ``autoswiftfile`` directive may be: absolute, relative
+    to a search path entry or relative to the documentation source"""
+    if os.path.isabs(name):
+        return [name]
+    return [os.path.join(path, name) for path in env.config.swift_search_path] + [os.path.join(env.srcdir, name)]
 
 
 class SwiftAutoDocumenter(Documenter):
@@ -26,7 +174,8 @@ class SwiftAutoDocumenter(Documenter):
         'exclude-members': members_set_option,  # exclude these members
         'private-members': bool_option,         # show private members
         'only-with-members': members_set_option,  # only document if it contains the member 
-        'only-with-raw-members': members_set_option #only document if it contains the raw member
+        'only-with-raw-members': members_set_option, #only document if it contains the raw member
+        'merged': bool_option,                  # document a type and all its extensions as one
     }
 
     def __init__(self, *args, **kwargs):
@@ -34,16 +183,37 @@ class SwiftAutoDocumenter(Documenter):
         self.append_at_end = []
 
     def generate(self, **kwargs):
+        with instrumentation.span('autodoc', self.name, docname=self.env.docname, directive=self.objtype):
+            self.generate_documentation()
+
+    def generate_documentation(self):
         global file_index
 
-        emit_warning = True
+        instrumentation.count('autodoc directives')
+        if is_glob(self.name):
+            self.generate_glob()
+            return
+
+        if 'merged' in self.options:
+            aggregate = file_index.aggregate(self.name)
+            if aggregate is not None:
+                self.document_aggregate(aggregate)
+                return
+
+        files = set()
         for index in file_index.find(self.name):
+            note_source(self.env, index['file'])
             self.document(index)
-            emit_warning = False
+            files.add(index['file'])
 
-        if emit_warning:
+        if files:
+            self.env.domaindata['swift']['resolved'].setdefault(self.env.docname, {})[self.name] = files
+        else:
+            self.env.domaindata['swift']['unresolved'].setdefault(self.env.docname, set()).add(self.name)
             #find best match
-            best = file_index.find_fuzz(self.name)
+            instrumentation.count('fuzzy lookups')
+            with instrumentation.span('fuzzy lookup', self.name):
+                best = file_index.find_fuzz(self.name)
             if best:
                 err = 'can not find "%s" in any Swift file.  Did you mean "%s"?' % (self.name,best[0])
             else:
@@ -52,6 +222,28 @@ class SwiftAutoDocumenter(Documenter):
                 self.env.docname,
                 err)
 
+    def generate_glob(self):
+        """Document every symbol the glob in the directive matches, in name order"""
+        names = set()
+        for name, item in file_index.find_glob(self.name):
+            if 'merged' not in self.options:
+                note_source(self.env, item['file'])
+                self.document(item)
+            elif name not in names:
+                self.document_aggregate(file_index.aggregate(name))
+            names.add(name)
+        self.env.domaindata['swift']['globs'].setdefault(self.env.docname, {})[self.name] = sorted(names)
+        if not names:
+            self.env.domaindata['swift']['unresolved'].setdefault(self.env.docname, set()).add(self.name)
+            self.env.warn(self.env.docname, 'no Swift symbol matches "%s"' % self.name)
+
+    def document_aggregate(self, aggregate):
+        for item in aggregate.all:
+            note_source(self.env, item['file'])
+        aggregates = self.env.domaindata['swift']['aggregates'].setdefault(self.env.docname, {})
+        aggregates[aggregate.name] = aggregate_files(aggregate)
+        self.document(aggregate.item())
+
     def document(self, item, indent=''):
         member_list = self.options.members if isinstance(self.options.members, list) else []
         raw_member_list = set(map(lambda x: x.replace("/",","),self.options.raw_members)) if isinstance(self.options.raw_members, set) else []
@@ -69,7 +261,7 @@ class SwiftAutoDocumenter(Documenter):
 
 
         # Don't document everything if a specific type was requested
-        if self.objtype != 'swift':
+        if self.objtype not in ('swift', 'swiftfile'):
             if item['type'] != self.objtype:
                 return
 
@@ -85,6 +277,11 @@ class SwiftAutoDocumenter(Documenter):
             content = indent + line
             self.add_line(content, '<autodoc>')
 
+        # conformances of constrained extensions in the merged view
+        for name, where in item.get('conditional', []):
+            self.add_line(indent + self.content_indent + 'Conforms to ``%s`` where ``%s``' % (name, where), '<autodoc>')
+            self.add_line('', '<autodoc>')
+
         # only document members when asked to
         if 'members' not in self.options and 'raw-members' not in self.options:
             return
@@ -105,7 +302,7 @@ class SwiftAutoDocumenter(Documenter):
             if 'private-members' not in self.options and member['scope'] != 'public':
                 add = False
             if add:
-                loc = item['file'] if 'file-location' in self.options else None
+                loc = member.get('file', item['file']) if 'file-location' in self.options else None
                 doc = SwiftObjectIndex.documentation(
                     member,
                     indent=self.content_indent,
@@ -116,11 +313,37 @@ class SwiftAutoDocumenter(Documenter):
                 for line in doc:
                     content = indent + self.content_indent + line
                     self.add_line(content, '<autodoc>')
+                if member.get('where'):
+                    content = indent + self.content_indent * 2 + 'Available where ``%s``' % member['where']
+                    self.add_line(content, '<autodoc>')
+                    self.add_line('', '<autodoc>')
 
         if 'recursive-members' in self.options:
             for child in item['children']:
                 self.document(child, indent=indent + self.content_indent)
 
+class FileAutoDocumenter(SwiftAutoDocumenter):
+    """Documents all toplevel symbols of a Swift file in source order"""
+    objtype = 'swiftfile'
+
+    def generate_documentation(self):
+        instrumentation.count('autodoc directives')
+        candidates = swift_file_candidates(self.env, self.name)
+        file = next((candidate for candidate in candidates if os.path.isfile(candidate)), None)
+        if file is None:
+            # read the document again when the file shows up
+            for candidate in candidates:
+                note_source(self.env, candidate)
+            self.env.warn(self.env.docname, 'can not find Swift file "%s"' % self.name)
+            return
+
+        note_source(self.env, file)
+        items = file_index.find_file(file)
+        if not items:
+            self.env.warn(self.env.docname, 'no Swift symbols in "%s"' % self.name)
+        for item in items:
+            self.document(item)
+
 class ProtocolAutoDocumenter(SwiftAutoDocumenter):
     objtype = 'protocol'
 
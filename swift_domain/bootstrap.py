@@ -2,9 +2,19 @@
 # BSD license, see LICENSE for details
 
 import argparse
+import hashlib
+import io
+import json
 import os
+import shutil
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
-from swift_domain.indexer import SwiftFileIndex, SwiftObjectIndex
+from swift_domain.cache import IndexCache
+from swift_domain.indexer import ParseTimeout, SwiftFileIndex, SwiftObjectIndex, find_swift_files
+from swift_domain.quarantine import Quarantine
 
 parser = argparse.ArgumentParser(description='Bootstrap ReStructured Text documentation for Swift code.')
 parser.add_argument(
@@ -33,6 +43,60 @@ parser.add_argument(
     required=False,
     default=False
 )
+parser.add_argument(
+    '--update',
+    dest='update',
+    action='store_true',
+    help='''Only rewrite documentation files whose content changed and remove
+    documentation for Swift files that no longer exist''',
+    required=False,
+    default=False
+)
+parser.add_argument(
+    '--watch',
+    dest='watch',
+    action='store_true',
+    help='''Keep running and regenerate the documentation of Swift files when they
+    change, implies --update''',
+    required=False,
+    default=False
+)
+parser.add_argument(
+    '--watch-interval',
+    dest='watch_interval',
+    metavar='seconds',
+    type=float,
+    help='Time between two scans of the source tree in watch mode',
+    required=False,
+    default=0.5
+)
+parser.add_argument(
+    '-j', '--jobs',
+    dest='jobs',
+    metavar='N',
+    type=int,
+    help='Parse and write documentation with N worker processes',
+    required=False,
+    default=1
+)
+parser.add_argument(
+    '--split-types',
+    dest='split_types',
+    action='store_true',
+    help='''Write one page per toplevel type and an index page with a toctree for
+    Swift files whose documentation exceeds the split threshold''',
+    required=False,
+    default=False
+)
+parser.add_argument(
+    '--split-threshold',
+    dest='split_threshold',
+    metavar='lines',
+    type=int,
+    help='Minimum number of lines of a page before it is split by --split-types',
+    required=False,
+    default=1000
+)
 parser.add_argument(
     '--undoc-members',
     dest='undoc',
@@ -82,6 +146,63 @@ parser.add_argument(
     default=None,
     help='File with exclusion list for members'
 )
+parser.add_argument(
+    '--exclude',
+    dest='exclude_patterns',
+    metavar='pattern',
+    action='append',
+    required=False,
+    default=[],
+    help='''gitignore style pattern of Swift files or directories to skip, may be
+    given multiple times'''
+)
+parser.add_argument(
+    '--cache-dir',
+    dest='cache_dir',
+    metavar='path',
+    type=str,
+    required=False,
+    default=os.environ.get('ANARCHYSPHINX_CACHE'),
+    help='''Directory to cache parsed Swift files in, may be shared between checkouts
+    (default: $ANARCHYSPHINX_CACHE)'''
+)
+parser.add_argument(
+    '--cache-max-size',
+    dest='cache_max_size',
+    metavar='MB',
+    type=int,
+    required=False,
+    default=None,
+    help='Remove least recently used cache entries above this size'
+)
+parser.add_argument(
+    '--cache-max-age',
+    dest='cache_max_age',
+    metavar='days',
+    type=float,
+    required=False,
+    default=None,
+    help='Remove cache entries that were not used for this many days'
+)
+parser.add_argument(
+    '--parse-budget',
+    dest='parse_budget',
+    metavar='seconds',
+    type=float,
+    required=False,
+    default=None,
+    help='Give up on Swift files that take longer than this to parse'
+)
+parser.add_argument(
+    '--quarantine',
+    dest='quarantine',
+    metavar='file',
+    type=str,
+    required=False,
+    default=None,
+    help='''Record Swift files that exceed the parse budget in this file and skip
+    them once they timed out twice, until their content changes'''
+)
 parser.add_argument(
     '--use-autodocumenter',
     dest='autodocumenter',
@@ -91,46 +212,327 @@ parser.add_argument(
     required=False,
     default=False
 )
+parser.add_argument(
+    '-q', '--quiet',
+    dest='quiet',
+    action='store_true',
+    help='Only print errors and the summary at the end of the run',
+    required=False,
+    default=False
+)
+parser.add_argument(
+    '-v', '--verbose',
+    dest='verbose',
+    action='store_true',
+    help='Print a line with the parse time for every Swift file and every written page',
+    required=False,
+    default=False
+)
 
 
-def main():
-    args = parser.parse_args()
+def main(argv=None):
+    args = parser.parse_args(argv)
+    start = time.time()
+    if args.watch:
+        args.update = True
+    if args.quiet:
+        args.verbose = False
     source_path = os.path.abspath(args.source_path)
-    file_index = SwiftFileIndex([source_path])
+    cache = None
+    if args.cache_dir:
+        cache = IndexCache(
+            args.cache_dir,
+            max_size=args.cache_max_size * 1024 * 1024 if args.cache_max_size is not None else None,
+            max_age=args.cache_max_age
+        )
+    file_index = SwiftFileIndex(
+        [source_path],
+        jobs=args.jobs,
+        exclude_patterns=args.exclude_patterns,
+        cache=cache,
+        progress=progress('Indexing', source_path, args),
+        budget=args.parse_budget,
+        quarantine=Quarantine(args.quarantine) if args.quarantine else None
+    )
+    for file, elapsed, line in file_index.timeouts:
+        print("WARNING: Parsing '{}' took too long, aborted after {:.2f}s in line {}".format(
+            os.path.relpath(file, source_path),
+            elapsed,
+            line
+        ))
+    if not args.quiet:
+        for file in file_index.quarantined:
+            print("Skipping quarantined file '{}'".format(os.path.relpath(file, source_path)))
+    if args.verbose:
+        for file, _, duration, _, cached in file_index.parse_times:
+            print("Parsed '{}' in {:.3f}s{}".format(
+                os.path.relpath(file, source_path),
+                duration,
+                ' (cached)' if cached else ''
+            ))
 
     try:
         os.makedirs(args.documentation_path)
     except FileExistsError:
         pass
 
+    # sort by file name so unchanged sources produce identical output
+    files = sorted(file_index.by_file().items())
+
     # check for overwrite
-    for file, members in file_index.by_file().items():
-        destfile = get_dest_file(file, args.source_path, args.documentation_path)
-        if os.path.exists(destfile) and not args.overwrite:
-            print("""ERROR: {} already exists, to overwrite existing
-                     documentation use the '--overwrite' flag""".format(file))
-            exit(1)
+    if not args.update:
+        for file, members in files:
+            for destfile in possible_dest_files(file, members, args):
+                if os.path.exists(destfile) and not args.overwrite:
+                    print("""ERROR: {} already exists, to overwrite existing
+                             documentation use the '--overwrite' flag""".format(destfile))
+                    exit(1)
 
     exclusion_list = []
     if args.exclusion_list:
         exclusion_list = open(args.exclusion_list, 'r').readlines()
 
-    for file, members in file_index.by_file().items():
+    manifest = load_manifest(args.documentation_path)
+    jobs = []
+    for file, members in files:
         destfile = get_dest_file(file, args.source_path, args.documentation_path)
-        print("Writing documentation for '{}'...".format(os.path.relpath(file, source_path)))
+        jobs.append((file, members, destfile, args, exclusion_list, source_path))
+
+    # every output file only depends on its own source file, results are
+    # reported in file order regardless of which worker finished first
+    show_progress = progress('Writing', source_path, args, key=lambda job: job[0])
+    if args.jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = pool.map(write_documentation, jobs)
+            outputs, written = report(results, jobs, source_path, args.verbose, show_progress)
+    else:
+        outputs, written = report(map(write_documentation, jobs), jobs, source_path, args.verbose, show_progress)
+
+    # remove documentation of Swift files that vanished since the last run
+    if args.update:
+        remove_stale(args.documentation_path, manifest, outputs, args.verbose)
+
+    save_manifest(args.documentation_path, outputs)
+
+    print(file_index.summary(base=source_path))
+    print("wrote documentation for {} Swift files ({} unchanged) in {:.2f}s total".format(
+        written,
+        len(outputs) - written,
+        time.time() - start
+    ))
+
+    if args.watch:
         try:
-            os.makedirs(os.path.dirname(destfile))
-        except FileExistsError:
+            watch(file_index, outputs, args, exclusion_list, source_path)
+        except KeyboardInterrupt:
             pass
-        with open(destfile, "w") as fp:
-            heading = 'Documentation for {}'.format(os.path.relpath(file, source_path))
-            fp.write(('=' * len(heading)) + '\n')
-            fp.write(heading + '\n')
-            fp.write(('=' * len(heading)) + '\n\n\n')
-            if args.autodocumenter:
-                auto_document(members, args, exclusion_list, fp)
-            else:
-                document(members, args, exclusion_list, file, fp, '')
+
+
+def stat_key(file):
+    try:
+        st = os.stat(file)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def watch(file_index, outputs, args, exclusion_list, source_path):
+    """Poll the source tree and only reparse and rewrite what changed"""
+    print("Watching '{}' for changes, press Ctrl-C to stop...".format(source_path))
+    stamps = dict((file, stat_key(file)) for file in file_index.files)
+    while True:
+        time.sleep(args.watch_interval)
+        watch_once(file_index, stamps, outputs, args, exclusion_list, source_path)
+
+
+def watch_once(file_index, stamps, outputs, args, exclusion_list, source_path):
+    """One round of `watch`, reindexes the Swift files whose `stat_key` differs
+    from `stamps` and rewrites their documentation, returns the changed and the
+    removed files"""
+    current = find_swift_files([source_path], args.exclude_patterns)
+    changed = []
+    for file in current:
+        key = stat_key(file)
+        if key is not None and stamps.get(file) != key:
+            stamps[file] = key
+            changed.append(file)
+    removed = sorted(set(stamps) - set(current))
+    if not changed and not removed:
+        return changed, removed
+
+    for file in changed:
+        try:
+            file_index.update_file(file)
+        except (OSError, UnicodeDecodeError) as e:
+            # probably caught the editor in the middle of saving, retry next round
+            print("ERROR: Could not index '{}': {}".format(file, e))
+            stamps.pop(file, None)
+        except ParseTimeout:
+            _, elapsed, line = file_index.timeouts[-1]
+            print("WARNING: Parsing '{}' took too long, aborted after {:.2f}s in line {}".format(
+                os.path.relpath(file, source_path),
+                elapsed,
+                line
+            ))
+    for file in removed:
+        file_index.remove_file(file)
+        del stamps[file]
+
+    by_file = file_index.by_file()
+    previous = {}
+    for file in sorted(set(changed + removed)):
+        rel = os.path.relpath(file, source_path)
+        previous[rel] = outputs.pop(rel, [])
+        if file in by_file:
+            destfile = get_dest_file(file, args.source_path, args.documentation_path)
+            job = (file, by_file[file], destfile, args, exclusion_list, source_path)
+            outputs.update(report([write_documentation(job)], [job], source_path, not args.quiet)[0])
+    remove_stale(args.documentation_path, previous, outputs, not args.quiet)
+    save_manifest(args.documentation_path, outputs)
+    return changed, removed
+
+def progress(label, source_path, args, key=None):
+    """Returns a wrapper for the files of a phase that keeps a single status line
+    updated while iterating, if stdout is a terminal and nobody asked for silence.
+    `key` maps the items to the file names to display"""
+    def show(files):
+        files = list(files)
+        if args.quiet or args.verbose or not sys.stdout.isatty() or not files:
+            for file in files:
+                yield file
+            return
+        width = shutil.get_terminal_size().columns - 1
+        for i, file in enumerate(files):
+            line = '{} [{:3d}%] {}'.format(label, 100 * (i + 1) // len(files), os.path.relpath(key(file) if key else file, source_path))
+            sys.stdout.write('\r' + line[:width].ljust(width))
+            sys.stdout.flush()
+            yield file
+        sys.stdout.write('\r' + ' ' * width + '\r')
+        sys.stdout.flush()
+    return show
+
+
+def report(results, jobs, source_path, verbose=True, progress=iter):
+    """Collect finished jobs, returns the generated pages by Swift file and the
+    number of Swift files whose documentation was written"""
+    outputs = {}
+    count = 0
+    for (file, _, _, args, _, _), (written, pages) in zip(progress(jobs), results):
+        rel = os.path.relpath(file, source_path)
+        outputs[rel] = [os.path.relpath(page, args.documentation_path) for page in pages]
+        count += written
+        if written and verbose:
+            print("Writing documentation for '{}'...".format(rel))
+    return outputs, count
+
+
+def remove_stale(doc_path, previous, outputs, verbose=True):
+    """Delete pages listed in `previous` that are not generated anymore"""
+    for rel, pages in sorted(previous.items()):
+        stale = [page for page in pages if page not in outputs.get(rel, [])]
+        if verbose and stale and any(os.path.exists(os.path.join(doc_path, page)) for page in stale):
+            print("Removing documentation for '{}'...".format(rel))
+        for page in stale:
+            page = os.path.join(doc_path, page)
+            if os.path.exists(page):
+                os.unlink(page)
+            # clean up the directory of split pages if this was the last one
+            try:
+                os.rmdir(os.path.dirname(page))
+            except OSError:
+                pass
+
+
+def write_documentation(job):
+    """Render and write all pages for one Swift file, returns whether anything was
+    written and the list of pages"""
+    file, members, destfile, args, exclusion_list, source_path = job
+    pages = render_pages(file, members, destfile, args, exclusion_list, source_path)
+    written = False
+    for page, content in pages:
+        if args.update:
+            written = write_if_changed(page, content) or written
+        else:
+            write_file(page, content)
+            written = True
+    return written, [page for page, _ in pages]
+
+
+def render_pages(file, members, destfile, args, exclusion_list, source_path):
+    heading = 'Documentation for {}'.format(os.path.relpath(file, source_path))
+    body = render(file, members, args, exclusion_list)
+    if not args.split_types or body.count('\n') <= args.split_threshold:
+        return [(destfile, (title(heading) + body).encode('utf-8'))]
+
+    # group by name so all extensions of a type end up on the same page
+    types = OrderedDict()
+    for member in members:
+        types.setdefault(member['name'], []).append(member)
+
+    base = os.path.splitext(destfile)[0]
+    pages = []
+    toctree = ['.. toctree::', '   :maxdepth: 1', '']
+    for name, items in types.items():
+        body = render(file, items, args, exclusion_list)
+        if not body:
+            continue
+        pages.append((os.path.join(base, name + '.rst'), (title(name) + body).encode('utf-8')))
+        toctree.append('   ' + os.path.basename(base) + '/' + name)
+
+    index = title(heading) + '\n'.join(toctree) + '\n'
+    return [(destfile, index.encode('utf-8'))] + pages
+
+
+def title(heading):
+    return ('=' * len(heading)) + '\n' + heading + '\n' + ('=' * len(heading)) + '\n\n\n'
+
+
+def render(file, members, args, exclusion_list):
+    fp = io.StringIO()
+    if args.autodocumenter:
+        auto_document(members, args, exclusion_list, fp)
+    else:
+        document(members, args, exclusion_list, file, fp, '')
+    return fp.getvalue()
+
+
+def write_file(destfile, content):
+    try:
+        os.makedirs(os.path.dirname(destfile))
+    except FileExistsError:
+        pass
+    with open(destfile, "wb") as fp:
+        fp.write(content)
+
+
+def write_if_changed(destfile, content):
+    """Write `content` to `destfile` unless the file already has exactly that content,
+    returns True if the file was written"""
+    if os.path.exists(destfile):
+        with open(destfile, "rb") as fp:
+            if hashlib.sha1(fp.read()).digest() == hashlib.sha1(content).digest():
+                return False
+    write_file(destfile, content)
+    return True
+
+
+# maps Swift files (relative to the source path) to the documentation files
+# generated from them, so `--update` knows what to clean up
+manifest_name = '.anarchysphinx.json'
+
+
+def load_manifest(doc_path):
+    try:
+        with open(os.path.join(doc_path, manifest_name), 'r') as fp:
+            manifest = json.load(fp)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return dict((rel, [pages] if isinstance(pages, str) else pages) for rel, pages in manifest.items())
+
+
+def save_manifest(doc_path, outputs):
+    content = json.dumps(outputs, indent=1, sort_keys=True) + '\n'
+    write_if_changed(os.path.join(doc_path, manifest_name), content.encode('utf-8'))
 
 
 def get_dest_file(filename, search_path, doc_path):
@@ -138,6 +540,17 @@ def get_dest_file(filename, search_path, doc_path):
     return os.path.join(doc_path, rel)[:-6] + '.rst'
 
 
+def possible_dest_files(filename, members, args):
+    """All files `render_pages` may write for a Swift file, including the per type
+    pages of --split-types"""
+    destfile = get_dest_file(filename, args.source_path, args.documentation_path)
+    result = [destfile]
+    if args.split_types:
+        base = os.path.splitext(destfile)[0]
+        result.extend(os.path.join(base, name + '.rst') for name in OrderedDict.fromkeys(m['name'] for m in members))
+    return result
+
+
 def auto_document(members, args, exclusion_list, fp):
     for member in members:
         add = True
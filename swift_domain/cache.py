@@ -0,0 +1,162 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Content addressed cache for parsed Swift files.
+
+Entries are stored by the SHA-256 of the file content (and of the indexer itself,
+so a new parser never sees results of an old one). Nothing in an entry depends
+on the path of the checkout, so one cache directory can be shared by multiple
+checkouts, worktrees and concurrent CI jobs on the same machine.
+
+Entries are plain JSON of the item and member dictionaries, loading an entry
+never runs code, even if someone else can write to the cache directory.
+
+Entries are written to a temporary file and renamed into place, readers therefore
+either see a complete entry or none at all. Eviction runs under a lock file and
+removes the least recently used entries until the cache is below its size limit,
+and all entries not used within the maximum age.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import swift_domain.indexer
+
+# changes of the entry format or the parser invalidate all entries
+FORMAT = b'json-1'
+_parser_hash = None
+
+
+def parser_hash():
+    global _parser_hash
+    if _parser_hash is None:
+        with open(swift_domain.indexer.__file__, 'rb') as fp:
+            _parser_hash = hashlib.sha256(fp.read()).digest()
+    return _parser_hash
+
+
+def dump_items(items):
+    """JSON compatible copy of parsed items"""
+    return [dict(item, members=item['members'].index, children=dump_items(item['children'])) for item in items]
+
+
+def load_items(items):
+    """Turn the result of `dump_items` back into items like the parser returns"""
+    for item in items:
+        item['members'] = swift_domain.indexer.MemberList(item['members'])
+        load_items(item['children'])
+    return items
+
+
+class IndexCache(object):
+
+    # a lock older than this is considered to be left over by a crashed process
+    stale_lock = 600
+
+    def __init__(self, path, max_size=None, max_age=None):
+        """
+        :param path: cache directory, created if it does not exist
+        :param max_size: maximum size of all entries in bytes
+        :param max_age: remove entries that were not used for this many days
+        """
+        self.path = os.path.abspath(path)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, content):
+        return hashlib.sha256(FORMAT + parser_hash() + content).hexdigest()
+
+    def entry(self, key):
+        return os.path.join(self.path, key[:2], key[2:])
+
+    def get(self, key):
+        """Load a cached parse result, returns None if there is none"""
+        path = self.entry(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as fp:
+                result = load_items(json.load(fp))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # unreadable entry, drop it and parse again
+            self.misses += 1
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+
+        # mark as recently used for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, key, value):
+        path = self.entry(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = '{}.{}.{}.tmp'.format(path, os.getpid(), id(value))
+        try:
+            with open(tmp, 'w', encoding='utf-8') as fp:
+                json.dump(dump_items(value), fp, separators=(',', ':'))
+            os.replace(tmp, path)
+        except OSError:
+            # the cache is an optimization only, never fail the build because of it
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def entries(self):
+        for directory in os.scandir(self.path):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, st.st_mtime, st.st_size
+
+    def evict(self):
+        """Enforce size and age limits, skipped if another process is already evicting"""
+        if self.max_size is None and self.max_age is None:
+            return
+
+        lock = os.path.join(self.path, 'evict.lock')
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(lock).st_mtime > self.stale_lock:
+                    os.unlink(lock)
+            except OSError:
+                pass
+            return
+
+        try:
+            os.close(fd)
+            entries = sorted(self.entries(), key=lambda entry: entry[1])
+            size = sum(entry[2] for entry in entries)
+            oldest = time.time() - self.max_age * 86400 if self.max_age is not None else None
+            for path, mtime, entry_size in entries:
+                if (oldest is None or mtime >= oldest) and (self.max_size is None or size <= self.max_size):
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                size -= entry_size
+        finally:
+            os.unlink(lock)
@@ -0,0 +1,119 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Builder for Dash/Zeal docsets.
+
+Works like the HTML builder but writes into ``<name>.docset/Contents/Resources/Documents``
+and fills the ``searchIndex`` table of the docset directly from the objects the
+domains already know, so there is no need to run ``doc2dash`` on the output.
+"""
+
+import sqlite3
+from os import path
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from sphinx.builders.html import StandaloneHTMLBuilder
+from sphinx.util.osutil import ensuredir
+
+# swift domain object types -> dash entry types
+entry_types = {
+    'function':      'Function',
+    'method':        'Method',
+    'class_method':  'Method',
+    'static_method': 'Method',
+    'class':         'Class',
+    'enum':          'Enum',
+    'enum_case':     'Value',
+    'struct':        'Struct',
+    'init':          'Constructor',
+    'protocol':      'Protocol',
+    'extension':     'Extension',
+    'default_impl':  'Extension',
+    'let':           'Constant',
+    'var':           'Variable',
+    'static_let':    'Constant',
+    'static_var':    'Variable',
+}
+
+info_plist = '''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
+<plist version="1.0">
+<dict>
+    <key>CFBundleIdentifier</key>
+    <string>{identifier}</string>
+    <key>CFBundleName</key>
+    <string>{name}</string>
+    <key>DocSetPlatformFamily</key>
+    <string>{identifier}</string>
+    <key>isDashDocset</key>
+    <true/>
+    <key>dashIndexFilePath</key>
+    <string>{index}</string>
+</dict>
+</plist>
+'''
+
+
+class DashBuilder(StandaloneHTMLBuilder):
+    name = 'dash'
+
+    def init(self):
+        self.docset_name = self.config.swift_dash_name or self.config.project
+        self.docset = path.join(self.app.outdir, self.docset_name + '.docset')
+        self.outdir = path.join(self.docset, 'Contents', 'Resources', 'Documents')
+        ensuredir(self.outdir)
+        StandaloneHTMLBuilder.init(self)
+
+    def handle_finish(self):
+        StandaloneHTMLBuilder.handle_finish(self)
+        self.finish_tasks.add_task(self.write_docset)
+
+    def index_entries(self):
+        for domain in self.env.domains.values():
+            for name, dispname, typ, docname, anchor, priority in domain.get_objects():
+                if domain.name == 'swift':
+                    entry_type = entry_types.get(typ)
+                    anchor = domain.signature_anchor(name)
+                    # classes, structs, ... carry their kind in front of the name
+                    dispname = dispname.split(' ', 1)[-1]
+                else:
+                    entry_type = typ.capitalize()
+                if not entry_type or priority < 0:
+                    continue
+                uri = self.get_target_uri(docname)
+                if anchor:
+                    uri += '#' + quote(anchor, safe='():,.')
+                yield dispname, entry_type, uri
+
+    def write_docset(self):
+        self.info('writing docset index... ', nonl=True)
+        content = info_plist.format(
+            identifier=escape(self.docset_name.lower().replace(' ', '-')),
+            name=escape(self.docset_name),
+            index=escape(self.get_target_uri(self.config.master_doc))
+        )
+        plist = path.join(self.docset, 'Contents', 'Info.plist')
+        try:
+            with open(plist, encoding='utf-8') as fp:
+                unchanged = fp.read() == content
+        except OSError:
+            unchanged = False
+        if not unchanged:
+            with open(plist, 'w', encoding='utf-8') as fp:
+                fp.write(content)
+
+        # only apply the differences to an existing index, all in one transaction
+        db = sqlite3.connect(path.join(self.docset, 'Contents', 'Resources', 'docSet.dsidx'))
+        try:
+            db.execute('CREATE TABLE IF NOT EXISTS searchIndex(id INTEGER PRIMARY KEY, name TEXT, type TEXT, path TEXT)')
+            db.execute('CREATE UNIQUE INDEX IF NOT EXISTS anchor ON searchIndex (name, type, path)')
+            existing = set(db.execute('SELECT name, type, path FROM searchIndex'))
+            entries = set(self.index_entries())
+            with db:
+                db.executemany('DELETE FROM searchIndex WHERE name = ? AND type = ? AND path = ?', existing - entries)
+                db.executemany('INSERT INTO searchIndex(name, type, path) VALUES (?, ?, ?)', entries - existing)
+        finally:
+            db.close()
+        self.info('done')
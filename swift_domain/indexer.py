@@ -2,18 +2,24 @@
 # Copyright 2016 Drew Crawford
 # BSD license, see LICENSE for details
 
+import io
 import re
-import fnmatch
 import os
+import time
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pprint import PrettyPrinter
 from fuzzywuzzy import process
 
+from swift_domain.instrumentation import instrumentation, count_symbols
+
 
 # member patterns
 func_pattern      = re.compile(r'\s*(final\s+)?(?P<scope>private\s+|public\s+|internal\s+)?(final\s+)?(?P<static>class\s|static\s+|mutating\s+)?(?P<type>func)\s+(?P<name>[a-zA-Z_][a-zA-Z0-9_]*\b)(?P<rest>[^{]*)')
 init_pattern      = re.compile(r'\s*(final\s+)?(?P<scope>private\s+|public\s+|internal\s+)?(final\s+|convenience\s+)*(?P<type>init\??)\s*(?P<rest>[^{]*)')
-var_pattern       = re.compile(r'\s*(final\s+)?(?P<add_scope>private\s*\(set\)\s+|private\s*\(get\)\s+)?(?P<scope>private\s+|public\s+|internal\s+)?(final\s+)?(?P<static>static\s+)?(?P<type>var\s+|let\s+)(?P<name>[a-zA-Z_][a-zA-Z0-9_]*\b)(?P<rest>[^{]*)(?P<computed>\s*{\s*)?')
-proto_var_pattern = re.compile(r'\s*(?P<static>static\s+)?(?P<type>var\s+)(?P<name>[a-zA-Z_][a-zA-Z0-9_]*\b)(?P<rest>[^{]*)(?P<computed>\s*{(?:\s*get\s+set\s*|\s*get\s*|\s*set\s*)}\s*)?')
+var_pattern       = re.compile(r'\s*(final\s+)?(?P<add_scope>private\s*\(set\)\s+|private\s*\(get\)\s+)?(?P<scope>private\s+|public\s+|internal\s+)?(final\s+)?(?P<static>static\s+)?(?P<type>var\s+|let\s+)(?P<name>[a-zA-Z_][a-zA-Z0-9_]*\b)(?P<rest>[^{]*)(?P<computed>{)?')
+proto_var_pattern = re.compile(r'\s*(?P<static>static\s+)?(?P<type>var\s+)(?P<name>[a-zA-Z_][a-zA-Z0-9_]*\b)(?P<rest>[^{]*)(?P<computed>{\s*(?:get\s+set|get|set)\s*})?')
 case_pattern      = re.compile(r'\s*(?P<type>case)\s+(?P<name>[a-zA-Z_][a-zA-Z0-9_]*\b)(\s*(?P<assoc_type>\([a-zA-Z_[(][a-zA-Z0-9_<>[\]()?!:, \t-]*\))\s*)?(\s*=\s*(?P<raw_value>.*))?')
 
 # markdown doc patterns
@@ -73,7 +79,7 @@ def protocol_sig(name=r'[a-zA-Z_][a-zA-Z0-9_]*'):
 
 
 def extension_sig(name=r'[a-zA-Z_][a-zA-Z0-9_]*'):
-    return re.compile(r'\s*(?P<scope>private\s+|public\s+|internal\s+)?(?P<struct>extension)\s+(?P<name>' + name + r'\b)(\s*:\s*(?P<type>[^{]*))*(\s*where\s+(?P<where>[^{]*))?')
+    return re.compile(r'\s*(?P<scope>private\s+|public\s+|internal\s+)?(?P<struct>extension)\s+(?P<name>' + name + r'\b)(\s*:\s*(?P<type>(?:(?!\bwhere\b)[^{])*))*(\s*where\s+(?P<where>[^{]*))?')
 
 
 # debug printer
@@ -83,20 +89,15 @@ pp = PrettyPrinter(indent=1)
 def pprint(*args):
     pp.pprint(*args)
 
-# brace balancing for determining in which depth we are
-string_pattern = re.compile(r'"(?:[^"\\]*(?:\\.)?)*"')
-line_comment_pattern = re.compile(r'(// .*$)')
-comment_pattern = re.compile(r'/\*(?:.)*\*/')
+# brace balancing for determining in which depth we are: strings and comments
+# are skipped in a single scan from left to right, the alternatives never
+# overlap and unterminated strings or comments just run to the end of the line,
+# so matching stays linear in the length of the line
+brace_token_pattern = re.compile(r'"(?:[^"\\]|\\.)*"?|/\*(?:[^*]|\*(?!/))*(?:\*/)?|//.*|[{}]')
 
 def balance_braces(line, brace_count):
-    if line.startswith("//"): return brace_count
-    line = string_pattern.sub("", line)
-    line = comment_pattern.sub("", line)
-    line = line_comment_pattern.sub("", line)
-    open_braces = line.count('{')
-    close_braces = line.count('}')
-    braces = brace_count + open_braces - close_braces
-    return braces
+    tokens = brace_token_pattern.findall(line)
+    return brace_count + tokens.count('{') - tokens.count('}')
 
 
 # fetch documentation block
@@ -230,75 +231,615 @@ def doc_block_to_rst(doc_block):
         yield l.strip()
 
 
-class SwiftFileIndex(object):
+# globs for qualified names: `*` and `?` stay within one name, `**` spans nested ones
+glob_special = re.compile(r'[*?\[]')
+glob_token = re.compile(r'\*\*|\*|\?|\[!?\]?[^]]*\]|[^*?\[]+|\[')
+
+
+def is_glob(name):
+    return glob_special.search(name) is not None
+
+
+def translate_glob(pattern):
+    """Returns the literal prefix of `pattern` and a regex matching the whole name"""
+    match = glob_special.search(pattern)
+    prefix = pattern[:match.start()] if match else pattern
+    regex = ''
+    for token in glob_token.findall(pattern):
+        if token == '**':
+            regex += '.*'
+        elif token == '*':
+            regex += '[^.]*'
+        elif token == '?':
+            regex += '[^.]'
+        elif token.startswith('[') and len(token) > 1:
+            regex += '[^' + token[2:] if token.startswith('[!') else token
+        else:
+            regex += re.escape(token)
+    return prefix, re.compile(regex + r'\Z')
+
+
+class ExcludePatterns(object):
+    """gitignore style exclusion patterns
+
+    Patterns without a slash match the name of a file or directory at any depth,
+    patterns containing a slash are matched against the path relative to the
+    search path. A trailing slash restricts a pattern to directories, ``**``
+    matches any number of directories and a leading ``!`` re-includes paths
+    excluded by an earlier pattern.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = []
+        for pattern in patterns or []:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith('#'):
+                continue
+            negate = pattern.startswith('!')
+            if negate:
+                pattern = pattern[1:]
+            dir_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            anchored = '/' in pattern
+            self.patterns.append((self.translate(pattern.lstrip('/')), negate, dir_only, anchored))
+
+    def __bool__(self):
+        return len(self.patterns) > 0
+
+    @staticmethod
+    def translate(pattern):
+        result = ''
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith('**/', i):
+                result += '(?:.*/)?'
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                result += '.*'
+                i += 2
+                continue
+            c = pattern[i]
+            i += 1
+            if c == '*':
+                result += '[^/]*'
+            elif c == '?':
+                result += '[^/]'
+            elif c == '[' and pattern.find(']', i + 1) >= 0:
+                end = pattern.find(']', i + 1)
+                chars = pattern[i:end]
+                if chars.startswith('!'):
+                    chars = '^' + chars[1:]
+                result += '[' + chars.replace('\\', '\\\\') + ']'
+                i = end + 1
+            else:
+                result += re.escape(c)
+        return re.compile(result + r'\Z')
+
+    def excluded(self, relpath, is_dir):
+        """Check if a path relative to the search path is excluded, last matching pattern wins"""
+        name = relpath.rsplit('/', 1)[-1]
+        result = False
+        for regex, negate, dir_only, anchored in self.patterns:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relpath if anchored else name):
+                result = not negate
+        return result
+
+
+# directory -> (mtime, subdirectories, swift files), a directory is only listed
+# again if its modification time changed since the last scan
+_listing_cache = {}
+
+# file systems with coarse timestamps (FAT, HFS+, some network file systems) keep the
+# modification time of a directory if a file is added within the same tick, so a
+# listing is only cached if it was made this many seconds after the modification
+mtime_granularity = 2
+
+
+def list_directory(path):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _listing_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
+
+    listed = time.time()
+    dirnames = []
+    filenames = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    dirnames.append(entry.name)
+            elif entry.name.endswith('.swift'):
+                filenames.append(entry.name)
+    # list in a stable order to get reproducible output
+    dirnames.sort()
+    filenames.sort()
+    if listed - mtime / 1e9 > mtime_granularity:
+        _listing_cache[path] = (mtime, dirnames, filenames)
+    else:
+        _listing_cache.pop(path, None)
+    return dirnames, filenames
+
+
+def find_swift_files(search_path, exclude_patterns=None):
+    """Return all Swift files below the directories in `search_path`, excluded
+    directories are not descended into"""
+    exclude = ExcludePatterns(exclude_patterns)
+    files = []
+
+    def scan(path, rel):
+        try:
+            dirnames, filenames = list_directory(path)
+        except OSError:
+            return
+        for filename in filenames:
+            if not exclude or not exclude.excluded(rel + filename, False):
+                files.append(os.path.join(path, filename))
+        for dirname in dirnames:
+            if not exclude or not exclude.excluded(rel + dirname, True):
+                scan(os.path.join(path, dirname), rel + dirname + '/')
+
+    for path in search_path:
+        scan(path, '')
+    return files
+
+
+class ParseTimeout(Exception):
+    """Parsing a file took longer than its budget, `line` is the line (counted from
+    1) the parser was working on"""
+
+    def __init__(self, line):
+        super().__init__(line)
+        self.line = line
+
+
+# patterns only see this many characters of a line, they are linear in the length of
+# the line, so a single match can not run much longer than the deadline checks between
+# them allow
+max_match_length = 10000
+
+
+def check_deadline(deadline, line):
+    if deadline is not None and time.time() > deadline:
+        raise ParseTimeout(line + 1)
+
+
+def index_file(file, cache=None, budget=None):
+    """Parse a single Swift file, returns the list of toplevel items
+
+    If an `IndexCache` is given, files with the same content are only parsed once.
+    Raises `ParseTimeout` if parsing takes longer than `budget` seconds.
+    """
+    with open(file, "rb") as fp:
+        data = fp.read()
+
+    if cache is not None:
+        key = cache.key(data)
+        symbols = cache.get(key)
+        if symbols is not None:
+            set_file(symbols, file)
+            return symbols
+
+    # universal newlines, just like reading the file in text mode
+    content = io.StringIO(data.decode('utf-8'), newline=None).readlines()
+    symbols = parse_swift(file, content, deadline=time.time() + budget if budget else None)
+
+    if cache is not None:
+        # entries are shared between checkouts, so they must not contain the path
+        set_file(symbols, None)
+        cache.put(key, symbols)
+        set_file(symbols, file)
+    return symbols
+
+
+def timed_index_file(file, cache=None, budget=None):
+    """`index_file` that also returns start time, duration, process, if the result
+    came from the cache and the line a timeout happened in, for measurements across
+    worker processes"""
+    start = time.time()
+    hits = cache.hits if cache is not None else 0
+    try:
+        symbols = index_file(file, cache=cache, budget=budget)
+    except ParseTimeout as e:
+        return [], start, time.time() - start, os.getpid(), False, e.line
+    cached = cache is not None and cache.hits > hits
+    return symbols, start, time.time() - start, os.getpid(), cached, None
+
+
+def set_file(items, file):
+    for item in items:
+        item['file'] = file
+        set_file(item['children'], file)
+
+
+def parse_swift(file, content, deadline=None):
+    """Find all symbols in the lines of a Swift file, raises `ParseTimeout` when
+    still working after `deadline`"""
+    symbol_stack = []
+    braces = 0
+    for (index, line) in enumerate(content):
+        check_deadline(deadline, index)
+        braces = balance_braces(line, braces)
+        # track boxed context
+        for pattern in SwiftFileIndex.symbol_signatures:
+            check_deadline(deadline, index)
+            match = pattern.match(line, 0, max_match_length)
+            if match:
+                match = match.groupdict()
+
+                struct = match['struct'].strip()
+                if 'scope' in match and match['scope']:
+                    scope = match['scope'].strip()
+                else:
+                    if struct == 'extension':
+                        scope = 'public'
+                    else:
+                        scope = 'internal'
+                item = {
+                    'file': file,
+                    'line': index,
+                    'depth': braces,
+                    'type': struct,
+                    'scope': scope,
+                    'name': match['name'].strip(),
+                    'docstring': get_doc_block(content, index - 1),
+                    'param': match['type'].strip() if match['type'] else None,
+                    'where': match['where'].strip() if 'where' in match and match['where'] else None,
+                    'children': [],
+                    'raw': line
+                }
+                if len(symbol_stack) > 0 and braces > symbol_stack[-1]['depth']:
+                    symbol_stack[-1]['children'].append(item)
+                else:
+                    symbol_stack.append(item)
+
+                # find members
+                start = index
+                if line.rstrip()[-1] == '{':
+                    start = index + 1
+                else:
+                    for i in range(index + 1, len(content)):
+                        l = content[i].lstrip()
+                        if len(l) > 0 and l[0] == '{':
+                            start = i
+                            break
+                item['members'] = SwiftObjectIndex(content, start, item['type'], deadline=deadline)
+    return symbol_stack
+
+
+def split_conformances(param):
+    """Split an inheritance clause like `Base, Dictionary<Key, Value>` at its
+    toplevel commas"""
+    result = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(param):
+        if c in '<([':
+            depth += 1
+        elif c in '>)]':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            result.append(param[start:i].strip())
+            start = i + 1
+    result.append(param[start:].strip())
+    return [name for name in result if name]
+
+
+class MergedMembers(object):
+    """Stands in for `SwiftObjectIndex` with the members of all declarations of a
+    type, every member knows the file and where clause of its declaration"""
+
+    def __init__(self, declarations):
+        self.declarations = declarations
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = []
+            for declaration in self.declarations:
+                for member in declaration['members'].index:
+                    member = dict(member, file=declaration['file'], where=declaration['where'])
+                    self._index.append(member)
+        return self._index
+
+
+class TypeAggregate(object):
+    """A type with all of its extensions, the primary declaration comes first"""
+
+    def __init__(self, name):
+        self.name = name
+        self.declarations = []
+        self.extensions = []
+
+    def add(self, item):
+        if item['type'] == 'extension':
+            self.extensions.append(item)
+        else:
+            self.declarations.append(item)
+
+    @property
+    def all(self):
+        # unconstrained extensions before constrained ones, each in index order
+        return self.declarations + sorted(self.extensions, key=lambda item: item['where'] is not None)
+
+    @property
+    def conformances(self):
+        """[(conformance, where clause, declaration)] of all declarations"""
+        result = []
+        for item in self.all:
+            for name in split_conformances(item['param'] or ''):
+                result.append((name, item['where'], item))
+        return result
+
+    def item(self):
+        """One item with the merged members, children and conformances, like the
+        ones of the index. Conformances with a where clause are listed separately."""
+        declarations = self.all
+        item = dict(declarations[0])
+        conformances = []
+        conditional = []
+        for name, where, _ in self.conformances:
+            if where is None and name not in conformances:
+                conformances.append(name)
+            elif where is not None and (name, where) not in conditional:
+                conditional.append((name, where))
+        item['param'] = ', '.join(conformances) or None
+        # where clauses are listed with the members and conformances they apply to
+        item['where'] = None
+        item['members'] = MergedMembers(declarations)
+        item['children'] = [child for declaration in declarations for child in declaration['children']]
+        item['conditional'] = conditional
+        item['declarations'] = declarations
+        return item
+
+
+def aggregate_types(names):
+    """Group (qualified name, item) pairs by name into `TypeAggregate`s"""
+    result = {}
+    for name, item in names:
+        if name not in result:
+            result[name] = TypeAggregate(name)
+        result[name].add(item)
+    return result
+
+
+class FileLookup(object):
+    """Items by Swift file, for classes with an `index` of toplevel items and a
+    `_by_path` cache that is reset whenever the index changes"""
+
+    def by_file(self, index=None):
+        result = {}
+
+        if not index:
+            index = self.index
+
+        for item in index:
+            if item['file'] not in result:
+                result[item['file']] = []
+            result[item['file']].append(item)
+
+        return result
+
+    def find_file(self, file):
+        """Toplevel items of a Swift file in source order"""
+        if self._by_path is None:
+            self._by_path = {}
+            for path, items in self.by_file().items():
+                if path:
+                    self._by_path[os.path.realpath(path)] = items
+        return self._by_path.get(os.path.realpath(file), [])
+
+
+class SwiftFileIndex(FileLookup):
     symbol_signatures = [class_sig(), enum_sig(), struct_sig(), extension_sig(), protocol_sig()]
 
-    def __init__(self, search_path):
+    def __init__(self, search_path, jobs=1, exclude_patterns=None, cache=None, symbol_graphs=None, progress=None,
+                 budget=None, quarantine=None):
+        """
+        :param progress: called with the list of files to parse, returns an iterable
+                         over them and may display the progress while it is consumed
+        :param budget: maximum seconds to parse one file, files taking longer are
+                       left out and listed in `timeouts`
+        :param quarantine: a `Quarantine` that records timeouts, quarantined files
+                           are skipped and listed in `quarantined`
+        """
+        start = time.time()
         self.index = []
+        self.search_path = search_path
+        self.exclude_patterns = exclude_patterns
+        self.cache = cache
+        self.symbol_graphs = symbol_graphs or []
+        self.budget = budget
+        self.quarantine = quarantine
+        # (file, start, duration, pid, cached) for every parsed file
+        self.parse_times = []
+        # (file, elapsed, line) for every file that ran out of time
+        self.timeouts = []
+        self.quarantined = []
+        self._names = None
+        self._by_path = None
+        self._aggregates = None
 
         # find all files
-        self.files = []
-        for path in search_path:
-            for root, dirnames, filenames in os.walk(path):
-                for filename in fnmatch.filter(filenames, '*.swift'):
-                    self.files.append(os.path.join(root, filename))
-
-        for file in self.files:
-            print("Indexing swift file: %s" % file)
-            symbol_stack = []
-            braces = 0
-            with open(file, "r",encoding="utf-8") as fp:
-
-                content = fp.readlines()
-                for (index, line) in enumerate(content):
-                    braces = balance_braces(line, braces)
-                    # track boxed context
-                    for pattern in self.symbol_signatures:
-                        match = pattern.match(line)
-                        if match:
-                            match = match.groupdict()
-
-                            struct = match['struct'].strip()
-                            if 'scope' in match and match['scope']:
-                                scope = match['scope'].strip()
-                            else:
-                                if struct == 'extension':
-                                    scope = 'public'
-                                else:
-                                    scope = 'internal'
-                            item = {
-                                'file': file,
-                                'line': index,
-                                'depth': braces,
-                                'type': struct,
-                                'scope': scope,
-                                'name': match['name'].strip(),
-                                'docstring': get_doc_block(content, index - 1),
-                                'param': match['type'].strip() if match['type'] else None,
-                                'where': match['where'].strip() if 'where' in match and match['where'] else None,
-                                'children': [],
-                                'raw': line
-                            }
-                            if len(symbol_stack) > 0 and braces > symbol_stack[-1]['depth']:
-                                symbol_stack[-1]['children'].append(item)
-                            else:
-                                symbol_stack.append(item)
+        with instrumentation.span('discovery', 'find swift files'):
+            self.files = find_swift_files(search_path, exclude_patterns)
+
+        # files described by a symbol graph do not have to be parsed
+        graph_items = []
+        files = self.files
+        if self.symbol_graphs:
+            from swift_domain.symbolgraph import load_symbol_graphs
+            with instrumentation.span('symbol graphs', 'load symbol graphs', files=len(self.symbol_graphs)):
+                graph_items = load_symbol_graphs(self.symbol_graphs)
+            covered = set(os.path.realpath(file) for file in self.by_file(graph_items) if file)
+            files = [file for file in self.files if os.path.realpath(file) not in covered]
+
+        if quarantine is not None:
+            self.quarantined = [file for file in files if quarantine.skipped(file)]
+            if self.quarantined:
+                skipped = set(self.quarantined)
+                files = [file for file in files if file not in skipped]
+                instrumentation.count('files quarantined', len(self.quarantined))
+
+        progress = progress or iter
+
+        # files are independent of each other, so they may be parsed in parallel,
+        # results are collected in file order either way
+        if jobs > 1 and len(files) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = pool.map(
+                    partial(timed_index_file, cache=cache, budget=budget),
+                    files,
+                    chunksize=max(1, len(files) // (jobs * 4))
+                )
+                for file, result in zip(progress(files), results):
+                    self.add_parsed(file, *result)
+        else:
+            for file in progress(files):
+                self.add_parsed(file, *timed_index_file(file, cache=cache, budget=budget))
+        self.index.extend(graph_items)
+
+        if quarantine is not None:
+            quarantine.save()
+
+        if cache is not None:
+            cache.evict()
+        self.elapsed = time.time() - start
+
+    def add_parsed(self, file, symbols, start, duration, pid, cached, timeout):
+        self.index.extend(symbols)
+        self.parse_times.append((file, start, duration, pid, cached))
+        instrumentation.add('parse', file, start, duration, pid, cached=cached)
+        instrumentation.count('files parsed')
+        if self.cache is not None:
+            instrumentation.count('cache hits' if cached else 'cache misses')
+        if timeout is not None:
+            self.timeouts.append((file, duration, timeout))
+            instrumentation.count('parse timeouts')
+            if self.quarantine is not None:
+                self.quarantine.record(file, duration, timeout)
+        elif self.quarantine is not None:
+            self.quarantine.release(file)
+
+    def summary(self, slowest=5, base=None):
+        """One line summary of the indexing run, with the slowest files
+
+        :param base: directory the file names are relative to, defaults to the
+                     current directory
+        """
+        cached = sum(1 for entry in self.parse_times if entry[4])
+        line = 'indexed {} Swift files ({} from cache), {} symbols in {:.2f}s'.format(
+            len(self.parse_times), cached, count_symbols(self.index), self.elapsed
+        )
+        if self.symbol_graphs:
+            line += ', {} symbol graphs'.format(len(self.symbol_graphs))
+        if self.timeouts:
+            line += ', {} timed out'.format(len(self.timeouts))
+        if self.quarantined:
+            line += ', {} quarantined'.format(len(self.quarantined))
+        times = sorted(self.parse_times, key=lambda entry: entry[2], reverse=True)[:slowest]
+        if times:
+            line += '; slowest: ' + ', '.join(
+                '{} ({:.3f}s)'.format(os.path.relpath(file, base or os.curdir), duration) for file, start, duration, pid, cached in times
+            )
+        return line
+
+    def save_symbol_table(self, path):
+        """Write the index as a compiled symbol table, see `swift_domain.symtab`"""
+        from swift_domain.symtab import write_symbol_table
+        write_symbol_table(self, path)
 
-                            # find members
-                            start = index
-                            if line.rstrip()[-1] == '{':
-                                start = index + 1
-                            else:
-                                for i in range(index + 1, len(content)):
-                                    l = content[i].lstrip()
-                                    if len(l) > 0 and l[0] == '{':
-                                        start = i
-                                        break
-                            item['members'] = SwiftObjectIndex(content, start, item['type'])
+    @staticmethod
+    def load_symbol_table(path):
+        """Open a compiled symbol table, the result can be used like a `SwiftFileIndex`"""
+        from swift_domain.symtab import SymbolTable
+        return SymbolTable(path)
+
+    def update_file(self, file):
+        """Reparse a single (new or modified) file and replace its items in the index,
+        raises `ParseTimeout` if it exceeds the budget. The items of a file that ran
+        out of time are dropped and the timeout is recorded like in a full run."""
+        start = time.perf_counter()
+        try:
+            symbols = index_file(file, cache=self.cache, budget=self.budget)
+        except ParseTimeout as e:
+            elapsed = time.perf_counter() - start
+            self.remove_file(file)
+            self.timeouts.append((file, elapsed, e.line))
+            instrumentation.count('parse timeouts')
+            if self.quarantine is not None:
+                self.quarantine.record(file, elapsed, e.line)
+                self.quarantine.save()
+            raise
+        if self.quarantine is not None:
+            self.quarantine.release(file)
+            self.quarantine.save()
+        positions = [i for i, item in enumerate(self.index) if item['file'] == file]
+        if positions:
+            self.index[positions[0]:positions[-1] + 1] = symbols
+        else:
+            self.index.extend(symbols)
+        if file not in self.files:
+            self.files.append(file)
+        self._names = self._by_path = self._aggregates = None
+
+    def remove_file(self, file):
+        """Drop all items of a deleted file from the index"""
+        self.index = [item for item in self.index if item['file'] != file]
+        if file in self.files:
+            self.files.remove(file)
+        self._names = self._by_path = self._aggregates = None
+
+    def name_index(self):
+        """Qualified names of all items sorted for range scans, and the items in
+        the same order"""
+        if self._names is None:
+            names = []
+
+            def collect(index, prefix):
+                for item in index:
+                    name = prefix + item['name']
+                    names.append((name, item))
+                    collect(item['children'], name + '.')
+            collect(self.index, '')
+            # stable, items with the same name keep the index order
+            names.sort(key=lambda entry: entry[0])
+            self._names = ([name for name, _ in names], [item for _, item in names])
+        return self._names
+
+    def find_glob(self, pattern):
+        """Yields (qualified name, item) for every item matching the glob `pattern`
+        in name order, only the names starting with its literal prefix are scanned"""
+        prefix, regex = translate_glob(pattern)
+        names, items = self.name_index()
+        for position in range(bisect_left(names, prefix), len(names)):
+            name = names[position]
+            if not name.startswith(prefix):
+                break
+            if regex.match(name):
+                yield name, items[position]
 
-            self.index.extend(symbol_stack)
+    def aggregate(self, name):
+        """The `TypeAggregate` of the type with the qualified `name`, or None. All
+        aggregates are built at once on first use."""
+        if self._aggregates is None:
+            self._aggregates = aggregate_types(zip(*self.name_index()))
+        return self._aggregates.get(name)
 
     def find(self, name, index=None, name_prefix=[]):
+        if not index and not name_prefix:
+            # whole index: range scan in the sorted names, same order as the walk below
+            names, items = self.name_index()
+            position = bisect_left(names, name)
+            while position < len(names) and names[position] == name:
+                yield items[position]
+                position += 1
+            return
+
         if not index:
             index = self.index
 
@@ -316,11 +857,10 @@ class SwiftFileIndex(object):
         """Return all names the receiver could find."""
         for item in index:
             yield ".".join(name_prefix + [item['name']])
-            for child in item['children']:
-                new_prefix = list(name_prefix)
-                new_prefix.append(item['name'])
-                for name in child.__names(item['children'],name_prefix=new_prefix):
-                    yield name
+            new_prefix = list(name_prefix)
+            new_prefix.append(item['name'])
+            for name in self.__names(item['children'],name_prefix=new_prefix):
+                yield name
 
                 
 
@@ -332,19 +872,6 @@ class SwiftFileIndex(object):
 
 
 
-    def by_file(self, index=None):
-        result = {}
-
-        if not index:
-            index = self.index
-
-        for item in index:
-            if item['file'] not in result:
-                result[item['file']] = []
-            result[item['file']].append(item)
-
-        return result
-
     @staticmethod
     def documentation(item, indent="    ", noindex=False, nodocstring=False, location=False):
         if item['param']:
@@ -362,7 +889,9 @@ class SwiftFileIndex(object):
         yield ''
 
         if not nodocstring:
-            for line in doc_block_to_rst(item['docstring']):
+            with instrumentation.span('docblock', item['name']):
+                lines = list(doc_block_to_rst(item['docstring']))
+            for line in lines:
                 yield indent + line
             yield ''
 
@@ -371,9 +900,17 @@ class SwiftFileIndex(object):
             yield ''
 
 
+class MemberList(object):
+    """Stands in for `SwiftObjectIndex` with members that were not parsed from
+    source, like cached or symbol graph members"""
+
+    def __init__(self, index=None):
+        self.index = index if index is not None else []
+
+
 class SwiftObjectIndex(object):
 
-    def __init__(self, content, line, typ):
+    def __init__(self, content, line, typ, deadline=None):
         signatures = [func_pattern, init_pattern, var_pattern]
         if typ == 'enum':
             signatures = [func_pattern, init_pattern, case_pattern]
@@ -384,6 +921,7 @@ class SwiftObjectIndex(object):
         braces = 1
         for i in range(line, len(content)):
             l = content[i]
+            check_deadline(deadline, i)
 
             # balance braces
             old_braces = braces
@@ -394,7 +932,8 @@ class SwiftObjectIndex(object):
                 continue
 
             for pattern in signatures:
-                match = pattern.match(l)
+                check_deadline(deadline, i)
+                match = pattern.match(l, 0, max_match_length)
                 if match:
                     match = match.groupdict()
                     if 'scope' in match:
@@ -459,7 +998,9 @@ class SwiftObjectIndex(object):
         yield ''
 
         if not nodocstring:
-            for line in doc_block_to_rst(item['docstring']):
+            with instrumentation.span('docblock', item['name']):
+                lines = list(doc_block_to_rst(item['docstring']))
+            for line in lines:
                 yield indent + ' ' + line
             yield ''
 
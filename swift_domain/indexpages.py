@@ -0,0 +1,60 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Paginated Swift indices.
+
+With ``swift_paginate_index`` enabled every letter group of a Swift index is
+written to a page of its own (``swift-modindex-a.html``, ...), the index page
+itself only links to the letter pages. Set it to a number to paginate only
+indices with more entries than that.
+"""
+
+
+def letter_page(indexname, letter):
+    if letter.isalnum() and ord(letter[0]) < 128:
+        return '{}-{}'.format(indexname, letter.lower())
+    return '{}-u{:04x}'.format(indexname, ord(letter[0]))
+
+
+def paginated(config, content):
+    setting = config.swift_paginate_index
+    if setting is True:
+        return True
+    if not setting:
+        return False
+    return sum(len(entries) for letter, entries in content) > setting
+
+
+def swift_indices(builder):
+    from .swift import SwiftModuleIndex
+    for indexname, indexcls, content, collapse in getattr(builder, 'domain_indices', []):
+        if issubclass(indexcls, SwiftModuleIndex) and paginated(builder.config, content):
+            yield indexname, indexcls, content, collapse
+
+
+def collect_index_pages(app):
+    for indexname, indexcls, content, collapse in swift_indices(app.builder):
+        letter_pages = [(letter, letter_page(indexname, letter)) for letter, entries in content]
+        for (letter, entries), (_, pagename) in zip(content, letter_pages):
+            context = dict(
+                indextitle='{} - {}'.format(indexcls.localname, letter),
+                content=[(letter, entries)],
+                collapse_index=collapse,
+                letter_pages=letter_pages,
+            )
+            yield pagename, context, 'domainindex.html'
+
+
+def index_page_context(app, pagename, templatename, context, doctree):
+    if templatename != 'domainindex.html' or 'letter_pages' in context:
+        return
+    for indexname, indexcls, content, collapse in swift_indices(app.builder):
+        if indexname != pagename:
+            continue
+        # only link to the letter pages instead of rendering all entries
+        context['letter_pages'] = [(letter, letter_page(indexname, letter)) for letter, entries in content]
+        context['content'] = [
+            (letter, [('{} ({})'.format(letter, len(entries)), 0, page, '', '', '', '')])
+            for (letter, entries), (_, page) in zip(content, context['letter_pages'])
+        ]
@@ -0,0 +1,132 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Timings and counters for the indexer and the Swift domain.
+
+Set ``swift_instrumentation`` in ``conf.py`` to a directory and the build writes
+
+- ``swift-instrumentation.json``: counters, total/maximum time per phase and the
+  slowest files, directives, ... of every phase
+- ``swift-trace.json``: all timed events in the Chrome trace event format, open
+  it in ``chrome://tracing`` or https://ui.perfetto.dev
+
+Nothing is recorded unless enabled, the spans are no-ops then.
+"""
+
+import json
+import os
+import time
+
+
+class Span(object):
+
+    def __init__(self, recorder, category, name, args):
+        self.recorder = recorder
+        self.category = category
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.recorder.add(self.category, self.name, self.start, time.time() - self.start, **self.args)
+        return False
+
+
+class NullSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+null_span = NullSpan()
+
+
+class Instrumentation(object):
+
+    # number of slowest events per phase in the summary
+    slowest_count = 20
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.events = []
+        self.counters = {}
+
+    def span(self, category, name, **args):
+        """Context manager timing the enclosed block as event `name` of phase `category`"""
+        if not self.enabled:
+            return null_span
+        return Span(self, category, name, args)
+
+    def add(self, category, name, start, duration, pid=None, **args):
+        """Record an event that was timed elsewhere, e.g. in a worker process"""
+        if self.enabled:
+            self.events.append((category, name, start, duration, pid or os.getpid(), args))
+
+    def count(self, counter, n=1):
+        if self.enabled:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def summary(self):
+        phases = {}
+        for category, name, start, duration, pid, args in self.events:
+            phase = phases.setdefault(category, {'count': 0, 'total': 0.0, 'max': 0.0, 'slowest': []})
+            phase['count'] += 1
+            phase['total'] += duration
+            phase['max'] = max(phase['max'], duration)
+            phase['slowest'].append((duration, name))
+        for phase in phases.values():
+            phase['slowest'] = [[name, duration] for duration, name in sorted(phase['slowest'], reverse=True)[:self.slowest_count]]
+        return {'counters': self.counters, 'phases': phases}
+
+    def trace(self):
+        events = []
+        end = 0
+        for category, name, start, duration, pid, args in self.events:
+            events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': int(start * 1000000),
+                'dur': int(duration * 1000000),
+                'pid': pid,
+                'tid': pid,
+                'args': args,
+            })
+            end = max(end, events[-1]['ts'] + events[-1]['dur'])
+        for counter, value in sorted(self.counters.items()):
+            events.append({'name': counter, 'ph': 'C', 'ts': end, 'pid': os.getpid(), 'args': {'value': value}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'swift-instrumentation.json'), 'w', encoding='utf-8') as fp:
+            json.dump(self.summary(), fp, indent=2, sort_keys=True)
+        with open(os.path.join(directory, 'swift-trace.json'), 'w', encoding='utf-8') as fp:
+            json.dump(self.trace(), fp)
+
+
+instrumentation = Instrumentation()
+
+
+def count_symbols(index):
+    count = 0
+    for item in index:
+        count += 1 + len(item['members'].index) + count_symbols(item['children'])
+    return count
+
+
+def write_instrumentation(app, exception):
+    if not app.config.swift_instrumentation or not instrumentation.enabled:
+        return
+    instrumentation.write(app.config.swift_instrumentation)
+    app.info('Swift instrumentation written to {}'.format(app.config.swift_instrumentation))
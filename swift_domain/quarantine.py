@@ -0,0 +1,79 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Quarantine for Swift files that do not parse within their time budget.
+
+Every timeout is recorded with the SHA-256 of the file content. Once the same
+content ran out of time `threshold` times the file is skipped by later runs,
+until its content changes. A file that parses in time again is released.
+
+The list is a JSON file, delete it or remove an entry to try a file again.
+"""
+
+import hashlib
+import json
+import os
+
+
+def content_hash(file):
+    with open(file, 'rb') as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
+
+
+class Quarantine(object):
+
+    def __init__(self, path, threshold=2):
+        """
+        :param path: JSON file to keep the list in, created when needed
+        :param threshold: number of timeouts of the same content before a file is skipped
+        """
+        self.path = path
+        self.threshold = threshold
+        self.changed = False
+        try:
+            with open(path, 'r', encoding='utf-8') as fp:
+                self.entries = json.load(fp)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def skipped(self, file):
+        """True if `file` is quarantined and did not change since"""
+        entry = self.entries.get(os.path.abspath(file))
+        if entry is None or entry['timeouts'] < self.threshold:
+            return False
+        try:
+            if content_hash(file) == entry['hash']:
+                return True
+        except OSError:
+            pass
+        self.release(file)
+        return False
+
+    def record(self, file, elapsed, line):
+        """Note that parsing `file` was aborted after `elapsed` seconds at `line`"""
+        key = os.path.abspath(file)
+        digest = content_hash(file)
+        entry = self.entries.get(key)
+        if entry is None or entry['hash'] != digest:
+            entry = self.entries[key] = {'hash': digest, 'timeouts': 0}
+        entry['timeouts'] += 1
+        entry['elapsed'] = elapsed
+        entry['line'] = line
+        self.changed = True
+        return entry['timeouts'] >= self.threshold
+
+    def release(self, file):
+        if self.entries.pop(os.path.abspath(file), None) is not None:
+            self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as fp:
+            json.dump(self.entries, fp, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+        self.changed = False
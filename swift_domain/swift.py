@@ -22,6 +22,7 @@ from sphinx.directives import ObjectDescription
 from sphinx.util.nodes import make_refnode
 from sphinx.util.docfields import Field, GroupedField, TypedField
 from .std import SwiftStandardDomain
+from .instrumentation import instrumentation, write_instrumentation
 
 def _iteritems(d):
     for k in d:
@@ -435,6 +436,9 @@ class SwiftModuleIndex(Index):
     localname = l_('Swift Module Index')
     shortname = l_('Index')
 
+    # object types listed, None for all
+    types = None
+
     @staticmethod
     def indexsorter(a):
         global type_order
@@ -455,12 +459,21 @@ class SwiftModuleIndex(Index):
         return a[3][start]
 
     def generate(self, docnames=None):
+        with instrumentation.span('index page', self.name):
+            return self.generate_index(docnames)
+
+    def generate_index(self, docnames=None):
         global type_order
         content = []
         collapse = 0
 
+        if self.types is not None and self.name[:-len('index')] not in self.domain.env.config.swift_type_indices:
+            return [], collapse
+
         entries = []
         for refname, (docname, typ, signature) in _iteritems(self.domain.data['objects']):
+            if self.types is not None and typ not in self.types:
+                continue
             info = typ.replace("_", " ")
             entries.append((
                 refname,
@@ -488,7 +501,8 @@ class SwiftModuleIndex(Index):
                 current_key = entry[3][start].upper()
                 current_list = []
             current_list.append(entry)
-        content.append((current_key, current_list))
+        if current_list:
+            content.append((current_key, current_list))
 
         result = []
         for key, entries in content:
@@ -498,6 +512,41 @@ class SwiftModuleIndex(Index):
         return result, collapse
 
 
+class SwiftClassIndex(SwiftModuleIndex):
+    name = 'classindex'
+    localname = l_('Swift Class Index')
+    shortname = l_('Classes')
+    types = ['class']
+
+
+class SwiftStructIndex(SwiftModuleIndex):
+    name = 'structindex'
+    localname = l_('Swift Struct Index')
+    shortname = l_('Structs')
+    types = ['struct']
+
+
+class SwiftEnumIndex(SwiftModuleIndex):
+    name = 'enumindex'
+    localname = l_('Swift Enum Index')
+    shortname = l_('Enums')
+    types = ['enum']
+
+
+class SwiftProtocolIndex(SwiftModuleIndex):
+    name = 'protocolindex'
+    localname = l_('Swift Protocol Index')
+    shortname = l_('Protocols')
+    types = ['protocol']
+
+
+class SwiftExtensionIndex(SwiftModuleIndex):
+    name = 'extensionindex'
+    localname = l_('Swift Extension Index')
+    shortname = l_('Extensions')
+    types = ['extension', 'default_impl']
+
+
 class SwiftDomain(Domain):
     """Swift language domain."""
     name = 'swift'
@@ -559,44 +608,101 @@ class SwiftDomain(Domain):
         'static_var':    SwiftXRefRole("static_var")
     }
     initial_data = {
-        'objects': {},  # fullname -> docname, objtype
+        'objects': {},     # fullname -> docname, objtype
+        'sources': {},     # docname -> {swift file -> mtime}
+        'unresolved': {},  # docname -> set of autoswift names not found
+        'resolved': {},    # docname -> {autoswift name -> swift files it was found in}
+        'globs': {},       # docname -> {autoswift glob -> matched names}
+        'aggregates': {},  # docname -> {merged type name -> swift files of its declarations}
     }
+    data_version = 4
     indices = [
         SwiftModuleIndex,
+        SwiftClassIndex,
+        SwiftStructIndex,
+        SwiftEnumIndex,
+        SwiftProtocolIndex,
+        SwiftExtensionIndex,
     ]
 
     def clear_doc(self, docname):
-        for fullname, (fn, _, _) in list(self.data['objects'].items()):
-            if fn == docname:
-                del self.data['objects'][fullname]
+        with instrumentation.span('clear_doc', docname):
+            for fullname, (fn, _, _) in list(self.data['objects'].items()):
+                if fn == docname:
+                    del self.data['objects'][fullname]
+            self.data['sources'].pop(docname, None)
+            self.data['unresolved'].pop(docname, None)
+            self.data['resolved'].pop(docname, None)
+            self.data['globs'].pop(docname, None)
+            self.data['aggregates'].pop(docname, None)
+
+    def merge_domaindata(self, docnames, otherdata):
+        for fullname, entry in otherdata['objects'].items():
+            if entry[0] in docnames:
+                self.data['objects'][fullname] = entry
+        for key in ('sources', 'unresolved', 'resolved', 'globs', 'aggregates'):
+            for docname, value in otherdata[key].items():
+                if docname in docnames:
+                    self.data[key][docname] = value
 
     def resolve_xref(self, env, fromdocname, builder,
                      typ, target, node, contnode):
-        for refname, (docname, type, signature) in _iteritems(self.data['objects']):
-            if refname == target:
-                node = make_refnode(builder, fromdocname, docname, signature, contnode, target)
-                return node
-        return None
+        with instrumentation.span('xref', target, docname=fromdocname):
+            instrumentation.count('xrefs')
+            for refname, (docname, type, signature) in _iteritems(self.data['objects']):
+                if refname == target:
+                    node = make_refnode(builder, fromdocname, docname, signature, contnode, target)
+                    return node
+            instrumentation.count('xrefs unresolved')
+            return None
 
     def get_objects(self):
         for refname, (docname, type, signature) in _iteritems(self.data['objects']):
             yield (refname, refname, type, docname, refname, 1)
 
+    def signature_anchor(self, refname):
+        """The id the description of `refname` has in the output. `get_objects` keeps
+        reporting the refname as anchor, intersphinx inventories link to that."""
+        return self.data['objects'][refname][2]
+
 def make_index(app,*args):
     from .autodoc import build_index
     build_index(app)
 
 def setup(app):
-    from .autodoc import SwiftAutoDocumenter, ProtocolAutoDocumenter, ExtensionAutoDocumenter, EnumAutoDocumenter
+    from .dash import DashBuilder
+    from .indexpages import collect_index_pages, index_page_context
+    from .autodoc import SwiftAutoDocumenter, FileAutoDocumenter, ProtocolAutoDocumenter, ExtensionAutoDocumenter, EnumAutoDocumenter, outdated_documents
     app.connect('builder-inited', make_index)
+    app.connect('env-get-outdated', outdated_documents)
+    app.connect('html-collect-pages', collect_index_pages)
+    app.connect('html-page-context', index_page_context)
+    app.connect('build-finished', write_instrumentation)
 
     app.override_domain(SwiftStandardDomain)
     app.add_autodocumenter(SwiftAutoDocumenter)
     app.add_autodocumenter(ProtocolAutoDocumenter)
     app.add_autodocumenter(ExtensionAutoDocumenter)
     app.add_autodocumenter(EnumAutoDocumenter)
+    app.add_autodocumenter(FileAutoDocumenter)
 
 
     app.add_domain(SwiftDomain)
+    app.add_builder(DashBuilder)
     app.add_config_value('swift_search_path', ['../src'], 'env')
+    app.add_config_value('swift_exclude_patterns', [], 'env')
+    app.add_config_value('swift_symbol_graph_path', [], 'env')
+    app.add_config_value('swift_symbol_graph_modules', None, 'env')
+    app.add_config_value('swift_symbol_table', None, '')
+    app.add_config_value('swift_index_cache', None, '')
+    app.add_config_value('swift_index_cache_max_size', 256 * 1024 * 1024, '')
+    app.add_config_value('swift_index_cache_max_age', 30, '')
     app.add_config_value('autodoc_default_flags', [], True)
+    app.add_config_value('swift_dash_name', None, 'html')
+    app.add_config_value('swift_type_indices', [], 'html')
+    app.add_config_value('swift_paginate_index', False, 'html')
+    app.add_config_value('swift_instrumentation', None, '')
+    app.add_config_value('swift_parse_budget', None, 'env')
+    app.add_config_value('swift_quarantine', None, '')
+    # not declared parallel read safe: what read workers record for the instrumentation
+    # is not merged back, and parallel reads of Sphinx 1.4 and 1.5 fail at random
@@ -0,0 +1,279 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Index backend for the symbol graph files the Swift compiler emits
+(``swift build -Xswiftc -emit-symbol-graph`` or ``swift symbolgraph-extract``).
+
+The symbol graph knows the exact declarations, so multi-line declarations,
+attributes, ``#if`` blocks and all access levels come out right, and nothing has
+to be parsed by regular expressions. The result has the same item/member
+structure as `SwiftFileIndex` produces.
+
+If the optional ``ijson`` package is installed (the ``symbolgraph`` extra) the
+files are read as a stream, otherwise they are loaded with the ``json`` module.
+Either way all symbols and relationships are kept until the items are built.
+"""
+
+import json
+import os
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+from swift_domain.indexer import MemberList
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+type_kinds = {
+    'swift.class': 'class',
+    'swift.struct': 'struct',
+    'swift.enum': 'enum',
+    'swift.protocol': 'protocol',
+    'swift.extension': 'extension',
+}
+
+member_kinds = {
+    'swift.method': ('func', None),
+    'swift.type.method': ('func', 'static'),
+    'swift.func.op': ('func', 'static'),
+    'swift.init': ('init', None),
+    'swift.property': ('var', None),
+    'swift.type.property': ('var', 'static'),
+    'swift.enum.case': ('case', None),
+}
+
+scopes = {
+    'open': 'public',
+    'public': 'public',
+    'internal': 'internal',
+    'fileprivate': 'private',
+    'private': 'private',
+}
+
+
+def module_name(path):
+    """`Foo.symbols.json` and `Foo@Bar.symbols.json` (extensions of types in Bar) both belong to Foo"""
+    return os.path.basename(path).split('.symbols.json')[0].split('@')[0]
+
+
+def find_symbol_graphs(paths, modules=None):
+    """Return all symbol graph files in `paths` (files or directories), optionally
+    only those of the given modules"""
+    result = []
+    for path in paths:
+        if os.path.isfile(path):
+            candidates = [path]
+        else:
+            candidates = []
+            for root, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                candidates.extend(os.path.join(root, f) for f in sorted(filenames) if f.endswith('.symbols.json'))
+        for candidate in candidates:
+            if modules is None or module_name(candidate) in modules:
+                result.append(candidate)
+    return result
+
+
+def read_symbol_graph(path):
+    """Yield ('symbol', dict) and ('relationship', dict) tuples from a symbol graph file"""
+    with open(path, 'rb') as fp:
+        if ijson is None:
+            data = json.loads(fp.read().decode('utf-8'))
+            for symbol in data.get('symbols', []):
+                yield 'symbol', symbol
+            for relationship in data.get('relationships', []):
+                yield 'relationship', relationship
+            return
+
+        builder = None
+        for prefix, event, value in ijson.parse(fp):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == current and event == 'end_map':
+                    yield kind, builder.value
+                    builder = None
+            elif event == 'start_map' and prefix in ('symbols.item', 'relationships.item'):
+                current = prefix
+                kind = 'symbol' if prefix == 'symbols.item' else 'relationship'
+                builder = ijson.common.ObjectBuilder()
+                builder.event(event, value)
+
+
+def declaration(symbol):
+    return ''.join(fragment['spelling'] for fragment in symbol.get('declarationFragments', []))
+
+
+def location(symbol):
+    loc = symbol.get('location')
+    if not loc:
+        return None, 0
+    uri = urlparse(loc['uri'])
+    return unquote(uri.path), loc.get('position', {}).get('line', 0)
+
+
+def docstring(symbol):
+    return [line['text'] for line in symbol.get('docComment', {}).get('lines', [])]
+
+
+def constraints_text(constraints):
+    parts = []
+    for constraint in constraints or []:
+        op = ' == ' if constraint.get('kind') == 'sameType' else ': '
+        parts.append(constraint['lhs'] + op + constraint['rhs'])
+    return ', '.join(parts) if parts else None
+
+
+def make_member(symbol, kind):
+    typ, static = member_kinds[kind]
+    decl = declaration(symbol)
+    path = symbol.get('pathComponents') or [symbol['names']['title']]
+    name = path[-1].split('(')[0]
+    file, line = location(symbol)
+    rest = None
+    assoc_type = None
+
+    if typ == 'init':
+        typ = 'init?' if 'init?' in decl else 'init'
+        rest = decl[decl.index(typ) + len(typ):].strip() if typ in decl else None
+        name = 'init'
+    else:
+        if static and ('class func ' in decl or 'class var ' in decl):
+            static = 'class'
+        if typ == 'var' and (' let ' in ' ' + decl):
+            typ = 'let'
+        # everything behind the name is the signature
+        keyword = {'func': 'func ', 'var': 'var ', 'let': 'let ', 'case': 'case '}[typ]
+        start = decl.find(keyword)
+        start = decl.find(name, start + len(keyword) if start >= 0 else 0)
+        if start >= 0:
+            rest = decl[start + len(name):].strip() or None
+        if typ == 'case' and rest and rest.startswith('('):
+            assoc_type, rest = rest, None
+
+    return {
+        'scope': scopes.get(symbol.get('accessLevel'), 'internal'),
+        'line': line,
+        'type': typ,
+        'name': name,
+        'static': static,
+        'docstring': docstring(symbol),
+        'rest': rest,
+        'assoc_type': assoc_type,
+        'raw_value': None,
+        'raw': decl,
+        'file': file,
+    }
+
+
+def make_item(symbol, typ):
+    file, line = location(symbol)
+    return {
+        'file': file,
+        'line': line,
+        'depth': len(symbol.get('pathComponents', [])),
+        'type': typ,
+        'scope': scopes.get(symbol.get('accessLevel'), 'internal'),
+        'name': symbol['names']['title'],
+        'docstring': docstring(symbol),
+        'param': None,
+        'where': None,
+        'children': [],
+        'raw': declaration(symbol),
+        'members': MemberList(),
+    }
+
+
+def load_symbol_graphs(paths):
+    """Build the toplevel items from a list of symbol graph files"""
+    symbols = OrderedDict()
+    relationships = []
+    for path in paths:
+        for kind, value in read_symbol_graph(path):
+            if kind == 'symbol':
+                symbols[value['identifier']['precise']] = value
+            else:
+                relationships.append(value)
+
+    items = OrderedDict()
+    for usr, symbol in symbols.items():
+        typ = type_kinds.get(symbol['kind']['identifier'])
+        if typ:
+            items[usr] = make_item(symbol, typ)
+            if typ == 'extension':
+                extension = symbol.get('swiftExtension', {})
+                items[usr]['where'] = constraints_text(extension.get('constraints'))
+
+    # members declared in extensions get grouped into extension items just like
+    # the source parser would report them
+    extensions = OrderedDict()
+    parents = {}
+    conformances = {}
+    for relationship in relationships:
+        source, target, kind = relationship['source'], relationship['target'], relationship['kind']
+        if kind in ('conformsTo', 'inheritsFrom') and source in items:
+            name = symbols[target]['names']['title'] if target in symbols else relationship.get('targetFallback', target)
+            conformances.setdefault(source, []).append(name.split('.')[-1])
+            continue
+        if kind not in ('memberOf', 'requirementOf', 'optionalRequirementOf') or source not in symbols:
+            continue
+
+        symbol = symbols[source]
+        if source in items:
+            # nested type
+            parents[source] = target
+            continue
+        member_kind = symbol['kind']['identifier']
+        if member_kind not in member_kinds:
+            continue
+
+        member = make_member(symbol, member_kind)
+        extension = symbol.get('swiftExtension')
+        if target in items and (items[target]['type'] == 'extension' or extension is None):
+            parent = items[target]
+        else:
+            # synthesize an extension block per extended type and constraints
+            where = constraints_text(extension.get('constraints') if extension else None)
+            key = (target, where, member['file'])
+            if key not in extensions:
+                if target in symbols:
+                    name = symbols[target]['names']['title']
+                else:
+                    name = relationship.get('targetFallback', target).split('.')[-1]
+                extensions[key] = {
+                    'file': member['file'],
+                    'line': member['line'],
+                    'depth': items[target]['depth'] if target in items else 1,
+                    'type': 'extension',
+                    'scope': 'public',
+                    'name': name,
+                    'docstring': [],
+                    'param': None,
+                    'where': where,
+                    'children': [],
+                    'raw': 'extension ' + name,
+                    'members': MemberList(),
+                }
+            parent = extensions[key]
+        del member['file']
+        parent['members'].index.append(member)
+
+    for usr, names in conformances.items():
+        items[usr]['param'] = ', '.join(names)
+
+    # nest types into their parents, everything else is toplevel
+    toplevel = []
+    for usr, item in items.items():
+        parent = parents.get(usr)
+        if parent in items:
+            items[parent]['children'].append(item)
+        else:
+            toplevel.append(item)
+    toplevel.extend(extensions.values())
+
+    for item in list(items.values()) + list(extensions.values()):
+        item['members'].index.sort(key=lambda member: member['line'])
+    toplevel.sort(key=lambda item: (item['file'] or '', item['line']))
+    return toplevel
@@ -0,0 +1,322 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Compiled symbol table for the Swift file index.
+
+The table is a single binary file that is opened with `mmap`, so opening it does
+not depend on the size of the code base and lookups only touch the pages they
+need. Multiple processes reading the same table share its pages.
+
+Layout (all integers little endian)::
+
+    header    magic, version and (offset, count) of every section
+    files     path, mtime and size of every input file (Swift files and
+              symbol graphs) followed by other files items refer to
+    items     fixed width records for classes, structs, enums, ... ordered so
+              the children of every item are stored next to each other,
+              toplevel items first
+    members   fixed width records for members, again contiguous per item
+    names     (qualified name, item) pairs sorted by name for binary search
+    strings   utf-8 string table, docstrings included, decoded on access
+"""
+
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+from fuzzywuzzy import process
+
+from swift_domain.indexer import FileLookup, aggregate_types, translate_glob
+
+MAGIC = b'SWFTSYM\0'
+VERSION = 2
+
+# a string is referenced by (offset, length) into the string table
+NONE = 0xffffffff
+
+item_string_fields = ['type', 'scope', 'name', 'param', 'where', 'raw', 'docstring']
+member_string_fields = ['scope', 'type', 'name', 'static', 'rest', 'assoc_type', 'raw_value', 'raw', 'docstring']
+
+HEADER = struct.Struct('<8sI' + 'II' * 6)
+FILE = struct.Struct('<IIqq')
+# file, line, depth, strings, parent, (first, count) of children and of members
+ITEM = struct.Struct('<IIi' + 'II' * len(item_string_fields) + 'iIIII')
+MEMBER = struct.Struct('<I' + 'II' * len(member_string_fields))
+NAME = struct.Struct('<III')
+
+# positions in an unpacked `ITEM`
+ITEM_STRINGS = 3
+ITEM_PARENT = ITEM_STRINGS + 2 * len(item_string_fields)
+ITEM_CHILDREN = ITEM_PARENT + 1
+ITEM_MEMBERS = ITEM_CHILDREN + 2
+
+
+class StringTable(object):
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def add(self, value):
+        if value is None or value == []:
+            return 0, NONE
+        if isinstance(value, list):
+            # docstrings are lists of lines
+            value = '\n'.join(value)
+        if value not in self.offsets:
+            encoded = value.encode('utf-8')
+            self.offsets[value] = (len(self.data), len(encoded))
+            self.data.extend(encoded)
+        return self.offsets[value]
+
+
+def write_symbol_table(file_index, path):
+    """Compile the items of a `SwiftFileIndex` into a symbol table at `path`"""
+    strings = StringTable()
+
+    files = []
+    file_numbers = {}
+
+    def add_file(file, stamp):
+        mtime, size = -1, -1
+        if stamp:
+            try:
+                st = os.stat(file)
+                mtime, size = st.st_mtime_ns, st.st_size
+            except OSError:
+                pass
+        file_numbers[file] = len(files)
+        files.append(FILE.pack(*(strings.add(file) + (mtime, size))))
+
+    inputs = list(file_index.files) + list(getattr(file_index, 'symbol_graphs', []))
+    for file in inputs:
+        add_file(file, True)
+
+    def add_item_files(index):
+        for item in index:
+            if item['file'] is not None and item['file'] not in file_numbers:
+                add_file(item['file'], False)
+            add_item_files(item['children'])
+    add_item_files(file_index.index)
+
+    # breadth first, so all children of an item get consecutive record numbers
+    queue = [(item, -1) for item in file_index.index]
+    items = []
+    members = []
+    numbers = {}
+    position = 0
+    while position < len(queue):
+        item, parent = queue[position]
+        numbers[id(item)] = position
+        first_child = len(queue)
+        queue.extend((child, position) for child in item['children'])
+        first_member = len(members)
+        for member in item['members'].index:
+            fields = []
+            for key in member_string_fields:
+                fields.extend(strings.add(member[key]))
+            members.append(MEMBER.pack(member['line'], *fields))
+        fields = []
+        for key in item_string_fields:
+            fields.extend(strings.add(item[key]))
+        items.append(ITEM.pack(
+            file_numbers.get(item['file'], NONE), item['line'], item['depth'], *fields,
+            parent, first_child, len(item['children']), first_member, len(members) - first_member
+        ))
+        position += 1
+
+    # qualified names in index order, the sort is stable so `find` keeps that order
+    names = []
+
+    def collect(index, prefix):
+        for item in index:
+            name = prefix + item['name']
+            names.append((name.encode('utf-8'), numbers[id(item)]))
+            collect(item['children'], name + '.')
+    collect(file_index.index, '')
+    names.sort(key=lambda entry: entry[0])
+    names = [NAME.pack(*(strings.add(name.decode('utf-8')) + (number,))) for name, number in names]
+
+    sections = [files, items, members, names]
+    offset = HEADER.size
+    layout = []
+    for section, size in zip(sections, [FILE.size, ITEM.size, MEMBER.size, NAME.size]):
+        layout.extend([offset, len(section)])
+        offset += len(section) * size
+    layout.extend([offset, len(strings.data)])
+    layout.extend([len(file_index.index), len(inputs)])
+
+    tmp = path + '.tmp%d' % os.getpid()
+    with open(tmp, 'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, VERSION, *layout))
+        for section in sections:
+            fp.write(b''.join(section))
+        fp.write(strings.data)
+    os.replace(tmp, path)
+
+
+class MemberIndex(object):
+    """Stands in for `SwiftObjectIndex`, decodes member records on first access"""
+
+    def __init__(self, table, first, count):
+        self.table = table
+        self.first = first
+        self.count = count
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = [self.table.member(number) for number in range(self.first, self.first + self.count)]
+        return self._index
+
+
+class SymbolRecord(Mapping):
+    """Read only item dictionary backed by the memory mapped table, every field is
+    only decoded when it is accessed"""
+
+    keys_ = ['file', 'line', 'depth', 'type', 'scope', 'name', 'docstring', 'param', 'where', 'children', 'raw', 'members']
+
+    def __init__(self, table, number):
+        self.table = table
+        self.number = number
+        self.record = ITEM.unpack_from(table.mm, table.items + number * ITEM.size)
+
+    def __getitem__(self, key):
+        record = self.record
+        if key in item_string_fields:
+            i = ITEM_STRINGS + 2 * item_string_fields.index(key)
+            value = self.table.string(record[i], record[i + 1])
+            if key == 'docstring':
+                return value.split('\n') if value is not None else []
+            return value
+        if key == 'file':
+            return self.table.files[record[0]] if record[0] != NONE else None
+        if key == 'line':
+            return record[1]
+        if key == 'depth':
+            return record[2]
+        if key == 'children':
+            first, count = record[ITEM_CHILDREN], record[ITEM_CHILDREN + 1]
+            return [SymbolRecord(self.table, number) for number in range(first, first + count)]
+        if key == 'members':
+            return MemberIndex(self.table, record[ITEM_MEMBERS], record[ITEM_MEMBERS + 1])
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.keys_)
+
+    def __len__(self):
+        return len(self.keys_)
+
+
+class SymbolTable(FileLookup):
+    """Read only replacement for `SwiftFileIndex` that works on a compiled table"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fp:
+            self.mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        header = HEADER.unpack_from(self.mm, 0)
+        if header[0] != MAGIC or header[1] != VERSION:
+            self.mm.close()
+            raise ValueError('{} is not a symbol table of version {}'.format(path, VERSION))
+        (files, file_count, self.items, self.item_count, self.members, self.member_count,
+            self.names, self.name_count, self.strings, _, self.toplevel_count, self.input_count) = header[2:]
+
+        self.files = []
+        self.stamps = []
+        self._by_path = None
+        self._aggregates = None
+        for i in range(file_count):
+            offset, length, mtime, size = FILE.unpack_from(self.mm, files + i * FILE.size)
+            self.files.append(self.string(offset, length))
+            self.stamps.append((mtime, size))
+
+    def close(self):
+        self.mm.close()
+
+    def string(self, offset, length):
+        if length == NONE:
+            return None
+        start = self.strings + offset
+        return self.mm[start:start + length].decode('utf-8')
+
+    def member(self, number):
+        record = MEMBER.unpack_from(self.mm, self.members + number * MEMBER.size)
+        member = {'line': record[0]}
+        for i, key in enumerate(member_string_fields):
+            member[key] = self.string(record[1 + 2 * i], record[2 + 2 * i])
+        member['docstring'] = member['docstring'].split('\n') if member['docstring'] is not None else []
+        return member
+
+    def is_fresh(self, files):
+        """Check that the table was built from exactly these files in their current state"""
+        if files != self.files[:self.input_count]:
+            return False
+        for file, (mtime, size) in zip(files, self.stamps):
+            try:
+                st = os.stat(file)
+            except OSError:
+                return False
+            if st.st_mtime_ns != mtime or st.st_size != size:
+                return False
+        return True
+
+    @property
+    def index(self):
+        return [SymbolRecord(self, number) for number in range(self.toplevel_count)]
+
+    def _name(self, position):
+        offset, length, number = NAME.unpack_from(self.mm, self.names + position * NAME.size)
+        start = self.strings + offset
+        return self.mm[start:start + length], number
+
+    def _lower_bound(self, key):
+        """Binary search for the first entry not sorting before `key`"""
+        low, high = 0, self.name_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, name, index=None, name_prefix=[]):
+        key = ".".join(name_prefix + [name]).encode('utf-8')
+        position = self._lower_bound(key)
+        while position < self.name_count:
+            found, number = self._name(position)
+            if found != key:
+                break
+            yield SymbolRecord(self, number)
+            position += 1
+
+    def find_glob(self, pattern):
+        """Like `SwiftFileIndex.find_glob`, scans the range of the literal prefix"""
+        prefix, regex = translate_glob(pattern)
+        key = prefix.encode('utf-8')
+        for position in range(self._lower_bound(key), self.name_count):
+            found, number = self._name(position)
+            if not found.startswith(key):
+                break
+            name = found.decode('utf-8')
+            if regex.match(name):
+                yield name, SymbolRecord(self, number)
+
+    def aggregate(self, name):
+        """Like `SwiftFileIndex.aggregate`, members are only decoded when used"""
+        if self._aggregates is None:
+            self._aggregates = aggregate_types(
+                (found.decode('utf-8'), SymbolRecord(self, number))
+                for found, number in map(self._name, range(self.name_count))
+            )
+        return self._aggregates.get(name)
+
+    def find_fuzz(self, name, index=None, name_prefix=[]):
+        """Returns the best match with a score like ("Foo",90)"""
+        names = (self._name(i)[0].decode('utf-8') for i in range(self.name_count))
+        return process.extractOne(name, names)
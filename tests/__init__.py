@@ -0,0 +1,10 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+"""
+Tests for the Swift domain, run from a checkout with
+``python -m unittest discover tests`` or ``python -m pytest tests``.
+
+The Sphinx builds run in a separate process, set ``SPHINX_PYTHON`` to use
+another interpreter than the one running the tests.
+"""
@@ -0,0 +1,56 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+conf = '''
+master_doc = 'index'
+extensions = ['swift_domain']
+swift_search_path = ['../src']
+'''
+
+
+class SphinxProject(unittest.TestCase):
+    """A throw away project with Swift sources in ``src`` and documents in ``docs``"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.write('docs/conf.py', conf)
+
+    def write(self, name, content):
+        path = os.path.join(self.path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(content)
+        # the mtime of a rewritten file has to change even on coarse file systems
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2000000000))
+
+    def build(self):
+        """Runs an incremental html build, returns the output of sphinx-build"""
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join([root] + [p for p in [env.get('PYTHONPATH')] if p])
+        env['PYTHONWARNINGS'] = 'ignore'
+        command = [
+            os.environ.get('SPHINX_PYTHON', sys.executable), '-m', 'sphinx', '-b', 'html',
+            os.path.join(self.path, 'docs'), os.path.join(self.path, 'build')
+        ]
+        # the search path is relative to the directory sphinx-build runs in
+        process = subprocess.run(
+            command, cwd=os.path.join(self.path, 'docs'), env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        output = process.stdout.decode('utf-8', 'replace')
+        self.assertEqual(process.returncode, 0, output)
+        return output
+
+    def page(self, docname):
+        with open(os.path.join(self.path, 'build', docname + '.html'), encoding='utf-8') as fp:
+            return fp.read()
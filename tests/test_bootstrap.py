@@ -0,0 +1,265 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from swift_domain import bootstrap
+from swift_domain.indexer import SwiftFileIndex
+
+type_source = '''
+/// The {name} type
+public class {name} {{
+    /// Does {name} things
+    public func run(count: Int) -> Bool {{
+    }}
+
+    /// The value
+    public var value: Int
+}}
+'''
+
+
+class BootstrapTest(unittest.TestCase):
+    """Runs `anarchysphinx` on Swift files in ``src``, documentation goes to ``docs``"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.src = os.path.join(self.path, 'src')
+        self.docs = os.path.join(self.path, 'docs')
+        os.makedirs(self.src)
+
+    def write(self, name, content):
+        path = os.path.join(self.src, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(content)
+        return path
+
+    def generate(self, modules=3, files=3):
+        for module in range(modules):
+            for file in range(files):
+                name = 'Type{}x{}'.format(module, file)
+                self.write('Module{}/{}.swift'.format(module, name), type_source.format(name=name))
+
+    def run_main(self, *args, docs=None):
+        """Runs the bootstrap, returns what it printed"""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            bootstrap.main([self.src, docs or self.docs] + list(args))
+        return output.getvalue()
+
+    def tree(self, path):
+        """{relative path: content} of all files below `path`"""
+        result = {}
+        for root, dirnames, filenames in os.walk(path):
+            for filename in filenames:
+                with open(os.path.join(root, filename), 'rb') as fp:
+                    result[os.path.relpath(os.path.join(root, filename), path)] = fp.read()
+        return result
+
+
+class JobsTest(BootstrapTest):
+
+    def test_parallel_run_writes_the_same_files(self):
+        self.generate()
+        self.run_main(docs=os.path.join(self.path, 'serial'))
+        self.run_main('--jobs', '2', docs=os.path.join(self.path, 'parallel'))
+
+        serial = self.tree(os.path.join(self.path, 'serial'))
+        self.assertEqual(len(serial), 10)
+        self.assertIn(os.path.join('Module1', 'Type1x2.rst'), serial)
+        self.assertEqual(self.tree(os.path.join(self.path, 'parallel')), serial)
+
+
+class SummaryTest(BootstrapTest):
+
+    def test_slowest_files_are_relative_to_the_source_path(self):
+        self.write('Sources/A.swift', type_source.format(name='A'))
+        output = self.run_main()
+        self.assertIn('; slowest: {} ('.format(os.path.join('Sources', 'A.swift')), output)
+
+
+class UpdateTest(BootstrapTest):
+
+    def set_mtimes(self, path, mtime):
+        for root, dirnames, filenames in os.walk(path):
+            for filename in filenames:
+                os.utime(os.path.join(root, filename), (mtime, mtime))
+
+    def mtimes(self, path):
+        return dict(
+            (os.path.relpath(os.path.join(root, filename), path), os.stat(os.path.join(root, filename)).st_mtime)
+            for root, dirnames, filenames in os.walk(path) for filename in filenames
+        )
+
+    def test_unchanged_sources_keep_their_pages(self):
+        self.generate()
+        self.run_main('--update')
+        self.set_mtimes(self.docs, 1000000000)
+        before = self.mtimes(self.docs)
+
+        self.run_main('--update')
+        self.assertEqual(self.mtimes(self.docs), before)
+
+    def test_deleted_source_removes_its_page(self):
+        self.generate()
+        lonely = self.write('Lonely/Only.swift', type_source.format(name='Only'))
+        self.run_main('--update')
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'Lonely', 'Only.rst')))
+
+        os.unlink(lonely)
+        output = self.run_main('--update', '--verbose')
+        self.assertIn("Removing documentation for '{}'".format(os.path.join('Lonely', 'Only.swift')), output)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, 'Lonely')))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'Module0', 'Type0x0.rst')))
+
+
+types_source = '''
+/// A foo
+public struct Foo {
+    /// The value
+    public var value: Int
+}
+
+/// A bar
+public class Bar {
+    /// Runs
+    public func run() {
+    }
+}
+
+/// Foos can be printed
+extension Foo: CustomStringConvertible {
+    /// The description
+    public var description: String {
+    }
+}
+'''
+
+
+class SplitTypesTest(BootstrapTest):
+
+    def read(self, name):
+        with open(os.path.join(self.docs, name), encoding='utf-8') as fp:
+            return fp.read()
+
+    def test_one_page_per_type(self):
+        self.write('Types.swift', types_source)
+        self.run_main('--split-types', '--split-threshold', '10')
+
+        index = self.read('Types.rst')
+        self.assertIn('.. toctree::\n   :maxdepth: 1\n\n   Types/Foo\n   Types/Bar\n', index)
+        self.assertNotIn('.. swift:', index)
+
+        # the extension is on the page of the type it extends
+        foo = self.read(os.path.join('Types', 'Foo.rst'))
+        self.assertTrue(foo.startswith('===\nFoo\n===\n'))
+        self.assertIn('.. swift:struct:: Foo\n', foo)
+        self.assertIn('.. swift:extension:: Foo : CustomStringConvertible\n', foo)
+        self.assertNotIn('Bar', foo)
+        bar = self.read(os.path.join('Types', 'Bar.rst'))
+        self.assertIn('.. swift:class:: Bar\n', bar)
+        self.assertNotIn('Foo', bar)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.docs, 'Types'))), ['Bar.rst', 'Foo.rst'])
+
+    def test_short_file_is_not_split(self):
+        self.write('Types.swift', types_source)
+        self.run_main('--split-types', '--split-threshold', '1000')
+        self.assertIn('.. swift:struct:: Foo\n', self.read('Types.rst'))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, 'Types')))
+
+    def test_existing_type_page_is_not_overwritten(self):
+        self.write('Types.swift', types_source)
+        os.makedirs(os.path.join(self.docs, 'Types'))
+        with open(os.path.join(self.docs, 'Types', 'Bar.rst'), 'w') as fp:
+            fp.write('handwritten')
+
+        with self.assertRaises(SystemExit) as raised:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                bootstrap.main([self.src, self.docs, '--split-types'])
+        self.assertEqual(raised.exception.code, 1)
+        self.assertIn('ERROR: {} already exists'.format(os.path.join(self.docs, 'Types', 'Bar.rst')), output.getvalue())
+        self.assertEqual(self.read(os.path.join('Types', 'Bar.rst')), 'handwritten')
+        self.assertEqual(os.listdir(self.docs), ['Types'])
+
+    def test_update_joins_pages_below_the_threshold(self):
+        types = self.write('Types.swift', types_source)
+        self.run_main('--update', '--split-types', '--split-threshold', '10')
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'Types', 'Foo.rst')))
+
+        with open(types, 'w', encoding='utf-8') as fp:
+            fp.write('\n/// A foo\npublic struct Foo {\n}\n')
+        self.run_main('--update', '--split-types', '--split-threshold', '10')
+        self.assertIn('.. swift:struct:: Foo\n', self.read('Types.rst'))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, 'Types')))
+
+
+class WatchTest(BootstrapTest):
+
+    def setUp(self):
+        super().setUp()
+        self.generate(modules=1, files=2)
+        self.run_main('--update')
+        self.args = bootstrap.parser.parse_args([self.src, self.docs, '--update', '--quiet'])
+        self.index = SwiftFileIndex([self.src])
+        self.stamps = dict((file, bootstrap.stat_key(file)) for file in self.index.files)
+        self.outputs = bootstrap.load_manifest(self.docs)
+
+    def watch_once(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result = bootstrap.watch_once(self.index, self.stamps, self.outputs, self.args, [], self.src)
+        self.assertEqual(output.getvalue(), '')
+        self.assertEqual(bootstrap.load_manifest(self.docs), self.outputs)
+        return result
+
+    def read(self, name):
+        with open(os.path.join(self.docs, name), encoding='utf-8') as fp:
+            return fp.read()
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.watch_once(), ([], []))
+
+    def test_modified_file(self):
+        file = self.write('Module0/Type0x1.swift', type_source.format(name='Type0x1').replace('run', 'walk'))
+        os.utime(file, (1000000000, 1000000000))
+        self.assertEqual(self.watch_once(), ([file], []))
+        self.assertIn('.. swift:method:: walk(count: Int) -> Bool', self.read(os.path.join('Module0', 'Type0x1.rst')))
+        self.assertEqual([member['name'] for member in self.index.by_file()[file][0]['members'].index], ['walk', 'value'])
+        self.assertEqual(self.watch_once(), ([], []))
+
+    def test_added_file(self):
+        file = self.write('Module1/Added.swift', type_source.format(name='Added'))
+        self.assertEqual(self.watch_once(), ([file], []))
+        self.assertIn('.. swift:class:: Added', self.read(os.path.join('Module1', 'Added.rst')))
+        self.assertEqual(self.outputs[os.path.join('Module1', 'Added.swift')], [os.path.join('Module1', 'Added.rst')])
+        self.assertEqual(len(list(self.index.find('Added'))), 1)
+
+    def test_timeout(self):
+        # a single line, that every pattern has to look at, takes longer than the budget
+        source = type_source.format(name='Type0x1')
+        file = self.write('Module0/Type0x1.swift', source.replace('    }\n\n', '    }\n    var x = "' + 'a\\"{' * 200000 + '\n'))
+        self.index.budget = 0.001
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            bootstrap.watch_once(self.index, self.stamps, self.outputs, self.args, [], self.src)
+        self.assertRegex(output.getvalue(), r"^WARNING: Parsing '{}' took too long, aborted after \d+\.\d\ds in line 7\n$".format(
+            os.path.join('Module0', 'Type0x1.swift')
+        ))
+        self.assertEqual(self.index.timeouts[-1][0], file)
+
+    def test_removed_file(self):
+        file = os.path.join(self.src, 'Module0', 'Type0x0.swift')
+        os.unlink(file)
+        self.assertEqual(self.watch_once(), ([], [file]))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, 'Module0', 'Type0x0.rst')))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, 'Module0', 'Type0x1.rst')))
+        self.assertNotIn(os.path.join('Module0', 'Type0x0.swift'), self.outputs)
+        self.assertEqual(list(self.index.find('Type0x0')), [])
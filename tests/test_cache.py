@@ -0,0 +1,115 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from swift_domain import cache
+from swift_domain.cache import IndexCache
+from swift_domain.indexer import index_file
+
+source = b'''
+/// A foo
+public class Foo {
+    /// bar
+    public func bar() {
+    }
+
+    public struct Inner {
+        public var baz: Int
+    }
+}
+'''
+
+
+class Exploit(object):
+    def __reduce__(self):
+        return (os.mkdir, (os.path.join(tempfile.gettempdir(), 'anarchysphinx-cache-exploit'),))
+
+
+class IndexCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.cache = IndexCache(os.path.join(self.path, 'cache'))
+
+    def swift_file(self, name, content=source):
+        path = os.path.join(self.path, name)
+        with open(path, 'wb') as fp:
+            fp.write(content)
+        return path
+
+    def test_cached_items_equal_parsed_items(self):
+        parsed = index_file(self.swift_file('A.swift'))
+        index_file(self.swift_file('B.swift'), cache=self.cache)
+        cached = index_file(self.swift_file('A.swift'), cache=self.cache)
+        self.assertEqual(self.cache.hits, 1)
+
+        self.assertEqual(cached[0]['file'], parsed[0]['file'])
+        self.assertEqual(cached[0]['name'], 'Foo')
+        self.assertEqual(cached[0]['members'].index, parsed[0]['members'].index)
+        self.assertEqual(cached[0]['children'][0]['members'].index, parsed[0]['children'][0]['members'].index)
+        self.assertEqual(cached[0]['children'][0]['file'], parsed[0]['file'])
+
+    def test_parser_change_invalidates_keys(self):
+        key = self.cache.key(source)
+        with mock.patch.object(cache, '_parser_hash', b'another parser'):
+            self.assertNotEqual(self.cache.key(source), key)
+        self.assertEqual(self.cache.key(source), key)
+
+        index_file(self.swift_file('A.swift'), cache=self.cache)
+        with mock.patch.object(cache, '_parser_hash', b'another parser'):
+            index_file(self.swift_file('A.swift'), cache=self.cache)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+    def test_pickled_entry_is_not_loaded(self):
+        marker = os.path.join(tempfile.gettempdir(), 'anarchysphinx-cache-exploit')
+        key = self.cache.key(source)
+        path = self.cache.entry(key)
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as fp:
+            pickle.dump(Exploit(), fp)
+
+        self.assertIsNone(self.cache.get(key))
+        self.assertFalse(os.path.exists(marker))
+        self.assertFalse(os.path.exists(path))
+
+    def fill(self, count):
+        """`count` entries, the first one is the least recently used"""
+        keys = []
+        now = time.time()
+        for i in range(count):
+            key = self.cache.key(str(i).encode('ascii'))
+            self.cache.put(key, [])
+            os.utime(self.cache.entry(key), (now - (count - i) * 86400, now - (count - i) * 86400))
+            keys.append(key)
+        return keys
+
+    def existing(self, keys):
+        return [key for key in keys if os.path.exists(self.cache.entry(key))]
+
+    def test_evict_by_size(self):
+        keys = self.fill(4)
+        size = os.stat(self.cache.entry(keys[0])).st_size
+        self.cache.max_size = 2 * size
+        self.cache.evict()
+        self.assertEqual(self.existing(keys), keys[2:])
+
+    def test_evict_by_age(self):
+        keys = self.fill(4)
+        self.cache.max_age = 2.5
+        self.cache.evict()
+        self.assertEqual(self.existing(keys), keys[2:])
+
+    def test_evict_skipped_while_locked(self):
+        keys = self.fill(2)
+        self.cache.max_size = 0
+        open(os.path.join(self.cache.path, 'evict.lock'), 'w').close()
+        self.cache.evict()
+        self.assertEqual(self.existing(keys), keys)
@@ -0,0 +1,56 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+import copy
+import unittest
+from functools import partial
+from types import SimpleNamespace
+
+from swift_domain.dash import DashBuilder
+from swift_domain.swift import SwiftDomain
+
+
+class MergeDomainDataTest(unittest.TestCase):
+    """What a parallel read worker collected has to end up in the main process"""
+
+    def test_merge_per_document_data(self):
+        main = SimpleNamespace(data=copy.deepcopy(SwiftDomain.initial_data))
+        main.data['sources']['index'] = {'A.swift': 1}
+        worker = copy.deepcopy(SwiftDomain.initial_data)
+        worker['objects']['Foo'] = ('api', 'class', None)
+        worker['objects']['Bar'] = ('other', 'class', None)
+        worker['sources']['api'] = {'B.swift': 2}
+        worker['unresolved']['api'] = {'Missing'}
+        worker['resolved']['api'] = {'Foo': {'B.swift'}}
+        worker['globs']['api'] = {'F*': ['Foo']}
+        worker['aggregates']['api'] = {'Foo': {'B.swift', 'C.swift'}}
+
+        SwiftDomain.merge_domaindata(main, ['api'], worker)
+
+        self.assertEqual(main.data['objects'], {'Foo': ('api', 'class', None)})
+        self.assertEqual(main.data['sources'], {'index': {'A.swift': 1}, 'api': {'B.swift': 2}})
+        self.assertEqual(main.data['unresolved'], {'api': {'Missing'}})
+        self.assertEqual(main.data['resolved'], {'api': {'Foo': {'B.swift'}}})
+        self.assertEqual(main.data['globs'], {'api': {'F*': ['Foo']}})
+        self.assertEqual(main.data['aggregates'], {'api': {'Foo': {'B.swift', 'C.swift'}}})
+
+
+class ObjectAnchorTest(unittest.TestCase):
+    """Inventories keep the refname anchor, the docset links to the signature id"""
+
+    def domain(self):
+        domain = SimpleNamespace(name='swift', data=copy.deepcopy(SwiftDomain.initial_data))
+        domain.data['objects']['Foo.bar'] = ('api', 'method', 'bar()')
+        domain.get_objects = partial(SwiftDomain.get_objects, domain)
+        domain.signature_anchor = partial(SwiftDomain.signature_anchor, domain)
+        return domain
+
+    def test_inventory_anchor_is_refname(self):
+        self.assertEqual(list(self.domain().get_objects()), [('Foo.bar', 'Foo.bar', 'method', 'api', 'Foo.bar', 1)])
+
+    def test_docset_anchor_is_signature(self):
+        builder = SimpleNamespace(
+            env=SimpleNamespace(domains={'swift': self.domain()}),
+            get_target_uri=lambda docname: docname + '.html'
+        )
+        self.assertEqual(list(DashBuilder.index_entries(builder)), [('Foo.bar', 'Method', 'api.html#bar()')])
@@ -0,0 +1,107 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+import os
+
+from tests.support import SphinxProject
+
+foo = '''
+/// A foo
+public class Foo {
+    /// bar
+    public func bar() {
+    }
+}
+'''
+
+extension = '''
+extension Foo {
+    /// qux
+    public func qux() {
+    }
+}
+'''
+
+
+class IncrementalBuildTest(SphinxProject):
+
+    def test_new_extension_in_other_file(self):
+        self.write('src/A.swift', foo)
+        self.write('docs/index.rst', 'Index\n=====\n\n.. autoswift:: Foo\n   :members:\n')
+        self.build()
+        self.assertNotIn('qux', self.page('index'))
+
+        self.write('src/B.swift', extension)
+        self.build()
+        self.assertIn('qux', self.page('index'))
+
+    def test_new_extension_of_merged_type(self):
+        self.write('src/A.swift', foo)
+        self.write('docs/index.rst', 'Index\n=====\n\n.. autoswift:: Foo\n   :members:\n   :merged:\n')
+        self.build()
+        self.assertNotIn('qux', self.page('index'))
+
+        self.write('src/C.swift', extension)
+        self.build()
+        self.assertIn('qux', self.page('index'))
+
+    def test_unrelated_document_is_not_read_again(self):
+        self.write('src/A.swift', foo)
+        self.write('src/B.swift', 'public struct Other {\n}\n')
+        self.write('docs/index.rst', 'Index\n=====\n\n.. toctree::\n\n   other\n\n.. autoswift:: Foo\n   :merged:\n')
+        self.write('docs/other.rst', 'Other\n=====\n\n.. autoswift:: Other\n')
+        self.build()
+
+        self.write('src/C.swift', extension)
+        output = self.build()
+        self.assertIn('0 added, 1 changed, 0 removed', output)
+        self.assertIn('reading sources... [100%] index', output)
+
+    def test_symbol_moved_to_other_file(self):
+        self.write('src/A.swift', foo)
+        self.write('src/B.swift', '')
+        self.write('docs/index.rst', 'Index\n=====\n\n.. autoswift:: Foo\n   :members:\n')
+        self.build()
+
+        self.write('src/B.swift', foo.replace('bar', 'baz'))
+        os.unlink(os.path.join(self.path, 'src/A.swift'))
+        self.build()
+        self.assertIn('baz', self.page('index'))
+
+    def test_glob_gains_a_match(self):
+        self.write('src/A.swift', foo)
+        self.write('docs/index.rst', 'Index\n=====\n\n.. autoswift:: F*\n')
+        self.build()
+        self.assertIn('A foo', self.page('index'))
+        self.assertNotIn('A fab', self.page('index'))
+
+        self.write('src/B.swift', '\n/// A fab\npublic struct Fab {\n}\n\n/// Not matched\npublic struct Other {\n}\n')
+        self.build()
+        self.assertIn('A fab', self.page('index'))
+        self.assertNotIn('Not matched', self.page('index'))
+
+    def test_glob_starting_with_a_wildcard(self):
+        inner = '/// {0}\npublic struct {0} {{\n    /// {0} inner\n    public struct Inner {{\n    }}\n}}\n'
+        self.write('src/A.swift', inner.format('Foo'))
+        self.write('src/B.swift', inner.format('Bar') + '\n/// Toplevel inner\npublic struct Inner {\n}\n')
+        self.write('docs/index.rst', 'Index\n=====\n\n.. autoswift:: *.Inner\n')
+        self.build()
+        page = self.page('index')
+        self.assertIn('Foo inner', page)
+        self.assertIn('Bar inner', page)
+        self.assertNotIn('Toplevel inner', page)
+
+        self.write('src/C.swift', inner.format('Baz'))
+        self.build()
+        self.assertIn('Baz inner', self.page('index'))
+
+    def test_swift_file_added_later(self):
+        self.write('src/A.swift', foo)
+        self.write('docs/index.rst', 'Index\n=====\n\n.. autoswiftfile:: Net/Client.swift\n')
+        output = self.build()
+        self.assertIn('can not find Swift file "Net/Client.swift"', output)
+
+        self.write('src/Net/Client.swift', '\n/// A client\npublic class Client {\n}\n')
+        output = self.build()
+        self.assertIn('0 added, 1 changed, 0 removed', output)
+        self.assertIn('A client', self.page('index'))
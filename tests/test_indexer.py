@@ -0,0 +1,194 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from swift_domain import indexer
+from swift_domain.indexer import ParseTimeout, SwiftFileIndex, find_swift_files, translate_glob
+
+foo = '''
+/// A foo
+public class Foo {
+    /// bar
+    public func bar() {
+    }
+}
+'''
+
+
+class SwiftSources(unittest.TestCase):
+    """Swift files in a throw away directory"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def write(self, name, content):
+        path = os.path.join(self.path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(content)
+        return path
+
+
+class ParseBudgetTest(SwiftSources):
+
+    def test_long_line_runs_out_of_time_in_watch_mode(self):
+        file = self.write('A.swift', foo)
+        self.write('B.swift', 'public struct Other {\n}\n')
+        index = SwiftFileIndex([self.path], budget=60)
+        self.assertEqual(len(list(index.find('Foo'))), 1)
+
+        # a single line, that every pattern has to look at, takes longer than the budget
+        self.write('A.swift', foo.replace('    }\n}', '    }\n    var x = "' + 'a\\"{' * 2000000 + '\n}'))
+        index.budget = 0.001
+        with self.assertRaises(ParseTimeout):
+            index.update_file(file)
+
+        self.assertEqual(list(index.find('Foo')), [])
+        self.assertEqual(len(list(index.find('Other'))), 1)
+        self.assertEqual([(timeout[0], timeout[2]) for timeout in index.timeouts], [(file, 7)])
+
+
+class DiscoveryTest(SwiftSources):
+
+    def names(self, patterns):
+        return [os.path.relpath(file, self.path) for file in find_swift_files([self.path], patterns)]
+
+    def test_exclude_patterns(self):
+        for name in ['A.swift', 'B.txt', 'Sources/C.swift', 'Sources/Generated/D.swift', 'Sources/Tests.swift',
+                     'Tests/E.swift', 'Pods/F/G.swift', 'Vendor/Tests/H.swift', 'Vendor/Keep/I.swift']:
+            self.write(name, '')
+
+        self.assertEqual(self.names(None), [
+            'A.swift', 'Pods/F/G.swift', 'Sources/C.swift', 'Sources/Tests.swift', 'Sources/Generated/D.swift',
+            'Tests/E.swift', 'Vendor/Keep/I.swift', 'Vendor/Tests/H.swift'
+        ])
+        # names match at any depth, a trailing slash only matches directories,
+        # a leading slash anchors to the search path
+        self.assertEqual(self.names(['Pods/', 'Tests/', '/Sources/Generated']), [
+            'A.swift', 'Sources/C.swift', 'Sources/Tests.swift', 'Vendor/Keep/I.swift'
+        ])
+        self.assertEqual(self.names(['/Tests']), [
+            'A.swift', 'Pods/F/G.swift', 'Sources/C.swift', 'Sources/Tests.swift', 'Sources/Generated/D.swift',
+            'Vendor/Keep/I.swift', 'Vendor/Tests/H.swift'
+        ])
+        # the last matching pattern wins
+        self.assertEqual(self.names(['**/Generated/**', 'Vendor/*', '!Vendor/Keep']), [
+            'A.swift', 'Pods/F/G.swift', 'Sources/C.swift', 'Sources/Tests.swift', 'Tests/E.swift', 'Vendor/Keep/I.swift'
+        ])
+        self.assertEqual(self.names(['*.swift', '!C.swift']), ['Sources/C.swift'])
+
+    def set_mtime(self, name, mtime):
+        os.utime(os.path.join(self.path, name), (mtime, mtime))
+
+    def test_listing_of_a_recently_modified_directory_is_not_cached(self):
+        # like a coarse file system: adding a file keeps the modification time
+        self.write('Sources/A.swift', '')
+        now = time.time()
+        self.set_mtime('Sources', now)
+        self.assertEqual(self.names(None), ['Sources/A.swift'])
+        self.write('Sources/B.swift', '')
+        self.set_mtime('Sources', now)
+        self.assertEqual(self.names(None), ['Sources/A.swift', 'Sources/B.swift'])
+
+    def test_listing_of_an_unchanged_directory_is_cached(self):
+        self.write('Sources/A.swift', '')
+        old = time.time() - 3600
+        self.set_mtime('Sources', old)
+        self.assertEqual(self.names(None), ['Sources/A.swift'])
+        self.write('Sources/B.swift', '')
+        self.set_mtime('Sources', old)
+        self.assertEqual(self.names(None), ['Sources/A.swift'])
+        self.assertIn(os.path.join(self.path, 'Sources'), indexer._listing_cache)
+
+
+class GlobTest(SwiftSources):
+
+    def test_translate_glob(self):
+        prefix, regex = translate_glob('Net.Client*')
+        self.assertEqual(prefix, 'Net.Client')
+        self.assertTrue(regex.match('Net.ClientError'))
+        self.assertFalse(regex.match('Net.Client.Error'))
+
+        prefix, regex = translate_glob('*.Inner')
+        self.assertEqual(prefix, '')
+        self.assertTrue(regex.match('Foo.Inner'))
+        self.assertFalse(regex.match('Foo.Bar.Inner'))
+        self.assertFalse(regex.match('Inner'))
+
+        prefix, regex = translate_glob('**.Inner')
+        self.assertTrue(regex.match('Foo.Bar.Inner'))
+
+        prefix, regex = translate_glob('Foo[!A-M]?')
+        self.assertEqual(prefix, 'Foo')
+        self.assertTrue(regex.match('FooZa'))
+        self.assertFalse(regex.match('FooBa'))
+        self.assertFalse(regex.match('FooZ.'))
+
+    def test_find_glob(self):
+        self.write('A.swift', ''.join(
+            'public struct {0} {{\n    public struct Inner {{\n    }}\n}}\n'.format(name)
+            for name in ['Abc', 'Foo', 'FooBar', 'Fop', 'Zed']
+        ))
+        index = SwiftFileIndex([self.path])
+
+        def names(pattern):
+            return [name for name, _ in index.find_glob(pattern)]
+
+        # only the names starting with the literal prefix are scanned
+        self.assertEqual(names('Foo*'), ['Foo', 'FooBar'])
+        self.assertEqual(names('Foo.*'), ['Foo.Inner'])
+        self.assertEqual(names('Fo?'), ['Foo', 'Fop'])
+        # no literal prefix, every name is scanned
+        self.assertEqual(names('*.Inner'), ['Abc.Inner', 'Foo.Inner', 'FooBar.Inner', 'Fop.Inner', 'Zed.Inner'])
+        self.assertEqual(names('*d'), ['Zed'])
+        self.assertEqual(names('Missing*'), [])
+
+
+class TypeAggregateTest(SwiftSources):
+
+    def test_type_declaration_comes_first(self):
+        # the extensions sort before the type, by file and by line
+        self.write('A.swift', (
+            '/// Equatable boxes\n'
+            'extension Box where T: Equatable {\n'
+            '    public func same(other: Box) -> Bool {\n'
+            '    }\n'
+            '}\n'
+            'extension Box: Hashable where T: Hashable {\n'
+            '}\n'
+            'extension Box: CustomStringConvertible {\n'
+            '    public var description: String {\n'
+            '    }\n'
+            '}\n'
+        ))
+        self.write('B.swift', '\n/// A box\npublic struct Box<T> {\n    public var value: T\n}\n')
+        index = SwiftFileIndex([self.path])
+        aggregate = index.aggregate('Box')
+        self.assertEqual([(item['type'], item['where']) for item in aggregate.all], [
+            ('struct', None), ('extension', None), ('extension', 'T: Equatable'), ('extension', 'T: Hashable')
+        ])
+
+        item = aggregate.item()
+        self.assertEqual(item['type'], 'struct')
+        self.assertEqual(item['where'], None)
+        self.assertEqual(item['docstring'], [' A box'])
+        self.assertEqual(item['param'], 'CustomStringConvertible')
+        self.assertEqual(item['conditional'], [('Hashable', 'T: Hashable')])
+        self.assertEqual([(member['name'], member['where']) for member in item['members'].index], [
+            ('value', None), ('description', None), ('same', 'T: Equatable')
+        ])
+        self.assertEqual(next(SwiftFileIndex.documentation(item)), '.. swift:struct:: Box : CustomStringConvertible')
+
+    def test_extensions_only(self):
+        self.write('A.swift', 'extension Array where Element: Box {\n    public func boxes() {\n    }\n}\n')
+        item = SwiftFileIndex([self.path]).aggregate('Array').item()
+        self.assertEqual(next(SwiftFileIndex.documentation(item)), '.. swift:extension:: Array')
+        self.assertEqual([(member['name'], member['where']) for member in item['members'].index], [
+            ('boxes', 'Element: Box')
+        ])
@@ -0,0 +1,142 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+import multiprocessing
+import random
+import re
+import time
+import unittest
+
+from swift_domain import indexer
+from swift_domain.indexer import SwiftFileIndex, balance_braces
+
+# linear patterns need well below a millisecond for these lines, backtracking ones
+# take seconds, so the limit leaves plenty of room for slow machines
+length = 20000
+limit = 0.25
+
+
+def adversarial_lines(length):
+    """Lines that made the old patterns backtrack, repeated up to `length` chars"""
+    def fill(prefix, unit, suffix=''):
+        return prefix + unit * max(1, (length - len(prefix) - len(suffix)) // len(unit)) + suffix
+
+    return [
+        ('unterminated string', fill('let x = "', 'a')),
+        ('unterminated string with escapes', fill('let x = "', 'a\\')),
+        ('escaped quotes', fill('"', '\\"')),
+        ('many quotes', fill('', '"\\')),
+        ('unterminated comments', fill('', '/*a')),
+        ('comment markers', fill('', '/*/')),
+        ('line comment markers', fill('', '/ /')),
+        ('braces', fill('', '{}{')),
+        ('leading whitespace', fill('', ' ', 'x')),
+        ('leading tabs and newlines', fill('', '\t \n', 'x')),
+        ('var without braces', fill('public var x: ', '[Int: ', '!')),
+        ('var with whitespace', fill('var x', ' ', '{')),
+        ('protocol var', fill('var x: Int {', ' get', ' set')),
+        ('case with parentheses', fill('case a', '(', '!')),
+        ('case with values', fill('case a(', 'Int, ', '= 1')),
+        ('class with colons', fill('class A', ' : B', '{')),
+        ('extension with where', fill('extension A', ' where B: C,', '{')),
+        ('func with generics', fill('func f', '<T', '(')),
+        ('parameter list', fill('- parameter ', 'a:', 'b')),
+        ('doc code', fill('', '`a')),
+    ]
+
+
+def patterns():
+    """(name, compiled pattern) of every pattern the indexer runs on source or doc lines"""
+    result = [('balance_braces', None)]
+    for name in sorted(dir(indexer)):
+        value = getattr(indexer, name)
+        if isinstance(value, type(re.compile(''))):
+            result.append((name, value))
+    for name, value in sorted(indexer.typical_patterns.items()):
+        result.append((name + ' pattern', value))
+    for i, value in enumerate(SwiftFileIndex.symbol_signatures):
+        result.append(('signature {}'.format(i), value))
+    return result
+
+
+def timed(pattern, line):
+    start = time.perf_counter()
+    if pattern is None:
+        balance_braces(line, 0)
+    elif pattern is indexer.code_pattern:
+        pattern.sub('', line)
+    else:
+        pattern.match(line)
+    return time.perf_counter() - start
+
+
+def time_patterns(line):
+    """[(name, duration)] of all patterns on `line`"""
+    return [(name, timed(pattern, line)) for name, pattern in patterns()]
+
+
+def reference_braces(line):
+    """Character by character version of `balance_braces`"""
+    count = 0
+    i = 0
+    while i < len(line):
+        c = line[i]
+        if c == '"':
+            i += 1
+            while i < len(line) and line[i] != '"':
+                i += 2 if line[i] == '\\' and i + 1 < len(line) and line[i + 1] != '\n' else 1
+        elif line.startswith('//', i):
+            break
+        elif line.startswith('/*', i):
+            end = line.find('*/', i + 2)
+            if end < 0:
+                break
+            i = end + 1
+        elif c == '{':
+            count += 1
+        elif c == '}':
+            count -= 1
+        i += 1
+    return count
+
+
+def random_line(rand, length):
+    alphabet = ['"', '\\', '/', '*', '{', '}', ' ', 'a', '(', ')', ':', '=', '\t', 'var ', 'case ', 'func ']
+    return ''.join(rand.choice(alphabet) for _ in range(rand.randint(0, length)))
+
+
+class PatternTest(unittest.TestCase):
+    """The indexer patterns have to stay linear in the length of a line"""
+
+    def test_all_patterns_are_checked(self):
+        names = [name for name, _ in patterns()]
+        for name in ('brace_token_pattern', 'var_pattern', 'proto_var_pattern', 'case_pattern', 'func_pattern'):
+            self.assertIn(name, names)
+
+    def test_adversarial_lines(self):
+        # in a worker process, an exponentially backtracking pattern would never return
+        pool = multiprocessing.Pool(1)
+        self.addCleanup(pool.terminate)
+        for label, line in adversarial_lines(length):
+            result = pool.apply_async(time_patterns, (line,))
+            try:
+                durations = result.get(timeout=limit * len(patterns()) + 5)
+            except multiprocessing.TimeoutError:
+                self.fail('patterns did not finish on {}'.format(label))
+            for name, duration in durations:
+                with self.subTest(pattern=name, line=label):
+                    self.assertLess(duration, limit)
+
+    def test_balance_braces_matches_reference(self):
+        rand = random.Random(42)
+        for i in range(2000):
+            line = random_line(rand, 200)
+            with self.subTest(line=line):
+                self.assertEqual(balance_braces(line, 0), reference_braces(line))
+                self.assertEqual(balance_braces(line, 3), reference_braces(line) + 3)
+
+    def test_balance_braces_examples(self):
+        self.assertEqual(balance_braces('func f() {', 0), 1)
+        self.assertEqual(balance_braces('let s = "{" // }', 1), 1)
+        self.assertEqual(balance_braces('let s = "\\"{" }', 1), 0)
+        self.assertEqual(balance_braces('/* { */ } /* {', 1), 0)
@@ -0,0 +1,135 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+import os
+import unittest
+
+from swift_domain import symbolgraph
+from swift_domain.symbolgraph import find_symbol_graphs, load_symbol_graphs
+
+fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'symbolgraph')
+
+
+def graph(name):
+    return os.path.join(fixtures, name + '.symbols.json')
+
+
+class FindSymbolGraphsTest(unittest.TestCase):
+
+    def test_all_modules(self):
+        self.assertEqual(
+            find_symbol_graphs([fixtures]),
+            [graph('Network'), graph('Network@Swift'), graph('Storage')]
+        )
+
+    def test_extension_graphs_belong_to_their_module(self):
+        self.assertEqual(find_symbol_graphs([fixtures], ['Network']), [graph('Network'), graph('Network@Swift')])
+        self.assertEqual(find_symbol_graphs([fixtures], ['Storage']), [graph('Storage')])
+        self.assertEqual(find_symbol_graphs([fixtures], ['Foundation']), [])
+
+    def test_files(self):
+        self.assertEqual(find_symbol_graphs([graph('Storage')]), [graph('Storage')])
+
+
+class LoadSymbolGraphsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.items = load_symbol_graphs(find_symbol_graphs([fixtures]))
+
+    def item(self, name, typ):
+        found = [item for item in self.items if item['name'] == name and item['type'] == typ]
+        self.assertEqual(len(found), 1, '{} {}'.format(typ, name))
+        return found[0]
+
+    def members(self, item):
+        return dict((member['name'], member) for member in item['members'].index)
+
+    def test_toplevel_items(self):
+        self.assertEqual(
+            [(item['type'], item['name']) for item in self.items],
+            [
+                ('extension', 'Array'),
+                ('extension', 'Array'),
+                ('class', 'Client'),
+                ('struct', 'Request'),
+                ('struct', 'Response'),
+                ('extension', 'Client'),
+                ('protocol', 'Store'),
+            ]
+        )
+
+    def test_type(self):
+        client = self.item('Client', 'class')
+        self.assertEqual(client['file'], '/project/Sources/Network/Client.swift')
+        self.assertEqual(client['line'], 2)
+        self.assertEqual(client['scope'], 'public')
+        self.assertEqual(client['docstring'], ['A client for a server.', '', 'Keeps one connection open.'])
+        self.assertEqual([member['name'] for member in client['members'].index], ['shared', 'retries', 'init', 'send', 'reset'])
+
+    def test_access_levels(self):
+        members = self.members(self.item('Client', 'class'))
+        self.assertEqual(members['send']['scope'], 'public')
+        self.assertEqual(members['retries']['scope'], 'internal')
+        self.assertEqual(members['reset']['scope'], 'private')
+        self.assertEqual(self.item('Response', 'struct')['scope'], 'internal')
+
+    def test_members(self):
+        members = self.members(self.item('Client', 'class'))
+        self.assertEqual((members['shared']['type'], members['shared']['static']), ('let', 'static'))
+        self.assertEqual((members['init']['type'], members['init']['rest']), ('init?', '(url: String)'))
+        self.assertEqual(members['send']['docstring'], ['Sends a request.', '- parameter request: what to send'])
+        self.assertNotIn('file', members['send'])
+
+    def test_multi_line_declaration(self):
+        send = self.members(self.item('Client', 'class'))['send']
+        self.assertEqual(send['type'], 'func')
+        self.assertEqual(send['rest'], '(\n    _ request: Request,\n    timeout: Double\n) -> Response')
+
+    def test_nested_types_and_conformances(self):
+        request = self.item('Request', 'struct')
+        self.assertEqual(request['param'], 'Hashable')
+        self.assertEqual([child['name'] for child in request['children']], ['Method'])
+        method = request['children'][0]
+        self.assertEqual((method['type'], method['param']), ('enum', 'Equatable'))
+        cases = self.members(method)
+        self.assertEqual(cases['get']['type'], 'case')
+        self.assertEqual(cases['custom']['assoc_type'], '(String)')
+
+    def test_extensions_with_where(self):
+        extensions = [item for item in self.items if item['name'] == 'Array']
+        self.assertEqual([item['where'] for item in extensions], ['Element == Request', 'Element: Hashable'])
+        self.assertEqual([list(self.members(item)) for item in extensions], [['sendAll'], ['requestCount']])
+        self.assertEqual(extensions[0]['file'], '/project/Sources/Network/Array+Request.swift')
+
+    def test_extension_symbol(self):
+        extension = self.item('Client', 'extension')
+        self.assertIsNone(extension['where'])
+        self.assertEqual(extension['param'], 'Store')
+        self.assertEqual(list(self.members(extension)), ['cache'])
+
+    def test_protocol_requirements(self):
+        load = self.members(self.item('Store', 'protocol'))['load']
+        self.assertEqual((load['type'], load['rest']), ('func', '(key: String) -> Any?'))
+
+
+def plain(items):
+    """Items with their members as lists, to compare them"""
+    return [
+        dict(item, members=item['members'].index, children=plain(item['children']))
+        for item in items
+    ]
+
+
+@unittest.skipIf(symbolgraph.ijson is None, 'ijson is not installed')
+class StreamingTest(unittest.TestCase):
+
+    def test_same_items_with_and_without_ijson(self):
+        paths = find_symbol_graphs([fixtures])
+        streamed = plain(load_symbol_graphs(paths))
+        module = symbolgraph.ijson
+        symbolgraph.ijson = None
+        try:
+            loaded = plain(load_symbol_graphs(paths))
+        finally:
+            symbolgraph.ijson = module
+        self.assertEqual(streamed, loaded)
@@ -0,0 +1,126 @@
+# Copyright 2016 by Johannes Schriewer
+# BSD license, see LICENSE for details
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from swift_domain.indexer import SwiftFileIndex
+from swift_domain.symtab import SymbolTable, item_string_fields, member_string_fields
+
+box = '''
+/// A box
+///
+/// - parameter T: the content
+public struct Box<T> {
+    /// The value
+    public var value: T
+
+    /// What is in the box
+    public enum Kind {
+        case empty
+        case full(T)
+    }
+}
+'''
+
+extensions = '''
+/// Equatable boxes
+extension Box where T: Equatable {
+    /// Compares
+    public func same(other: Box) -> Bool {
+    }
+}
+
+extension Box: CustomStringConvertible {
+    public var description: String {
+    }
+}
+
+/// Boxes things
+public protocol Boxing {
+    var box: Box<Int> { get }
+}
+'''
+
+
+class SymbolTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        for name, content in [('Box.swift', box), ('Sources/Extensions.swift', extensions)]:
+            path = os.path.join(self.path, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as fp:
+                fp.write(content)
+
+        self.index = SwiftFileIndex([self.path])
+        self.index.save_symbol_table(os.path.join(self.path, 'symbols'))
+        self.table = SwiftFileIndex.load_symbol_table(os.path.join(self.path, 'symbols'))
+        self.addCleanup(self.table.close)
+
+    def item(self, item):
+        """Everything the table stores of an item, as plain values"""
+        result = dict((key, item[key]) for key in ['file', 'line', 'depth'] + item_string_fields)
+        result['members'] = [
+            dict((key, member[key]) for key in ['line'] + member_string_fields) for member in item['members'].index
+        ]
+        result['children'] = [self.item(child) for child in item['children']]
+        return result
+
+    def test_items(self):
+        self.assertIsInstance(self.table, SymbolTable)
+        expected = [self.item(item) for item in self.index.index]
+        self.assertEqual([self.item(item) for item in self.table.index], expected)
+        self.assertEqual([item['name'] for item in expected], ['Box', 'Box', 'Box', 'Boxing'])
+        self.assertEqual(expected[0]['children'][0]['name'], 'Kind')
+        self.assertEqual([member['name'] for member in expected[0]['children'][0]['members']], ['empty', 'full'])
+
+    def test_lookups(self):
+        for name in ['Box', 'Box.Kind', 'Boxing', 'Missing']:
+            with self.subTest(name=name):
+                self.assertEqual(
+                    [self.item(item) for item in self.table.find(name)],
+                    [self.item(item) for item in self.index.find(name)]
+                )
+        self.assertEqual(len(list(self.table.find('Box'))), 3)
+        self.assertEqual(len(list(self.table.find('Kind', name_prefix=['Box']))), 1)
+
+        for pattern in ['Box*', '*.Kind', '*']:
+            with self.subTest(pattern=pattern):
+                self.assertEqual(
+                    [(name, self.item(item)) for name, item in self.table.find_glob(pattern)],
+                    [(name, self.item(item)) for name, item in self.index.find_glob(pattern)]
+                )
+
+        file = os.path.join(self.path, 'Sources', 'Extensions.swift')
+        self.assertEqual(
+            [self.item(item) for item in self.table.find_file(file)],
+            [self.item(item) for item in self.index.find_file(file)]
+        )
+        self.assertEqual(len(self.table.find_file(file)), 3)
+        self.assertEqual(sorted(self.table.by_file()), sorted(self.index.by_file()))
+
+    def test_aggregate(self):
+        expected = self.index.aggregate('Box')
+        aggregate = self.table.aggregate('Box')
+        self.assertEqual([self.item(item) for item in aggregate.all], [self.item(item) for item in expected.all])
+        item, expected = aggregate.item(), expected.item()
+        for key in ['type', 'name', 'where', 'param', 'conditional', 'docstring']:
+            self.assertEqual(item[key], expected[key])
+        self.assertEqual(
+            [(member['name'], member['where']) for member in item['members'].index],
+            [(member['name'], member['where']) for member in expected['members'].index]
+        )
+        self.assertIsNone(self.table.aggregate('Missing'))
+
+    def test_is_fresh(self):
+        files = list(self.index.files)
+        self.assertTrue(self.table.is_fresh(files))
+        self.assertFalse(self.table.is_fresh(files[:1]))
+
+        st = os.stat(files[0])
+        os.utime(files[0], ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+        self.assertFalse(self.table.is_fresh(files))